@@ -1,11 +1,10 @@
-import requests
-from bs4 import BeautifulSoup
+import http_client as hc
+import metrics as mt
+import response_cache as rc
+import results_table as rt
 
-# Get soup to parse through
-def get_soup(year=2025):
-    year_url = f"https://www.formula1.com/en/results/{year}/races"
-    soup = BeautifulSoup(str(requests.get(year_url).content), "html.parser")
-    return soup
+def get_url(year=2025):
+    return f"{hc.BASE_URL}/{year}/races"
 
 # Getting data in useable format
 def process_race_data(data):
@@ -23,26 +22,27 @@ def process_race_data(data):
     return data
 
 
-# Get final race results
-def get_all_races(year):
-    soup = get_soup(year)
-
+# Race calendar rows from the raw bytes of a season's results page
+def parse_all_races(content):
     data_rows = []
-    tr_content = soup.find_all('tr')[1:]  # Ignore first element b/c it's the headers
+    tr_content = rt.extract_rows(content)[1:]  # Ignore first element b/c it's the headers
 
     # Process data
     for tr in tr_content:
         row_data = []
-        for td in tr.find_all('td'):
-            text_ele = td.find('p')
-            some_link = td.find('a')['href'] if td.find('a') != None else None
-
-            # fixes any weird non-ASCII characters
-            text_content = str(text_ele.get_text(strip=True).replace('\\xc2\\xa0', ' ')).encode('utf-8').decode('unicode_escape').encode('latin-1').decode('utf-8')
-            row_data.append(text_content)
+        for text_content, some_link in tr:
+            row_data.append(text_content if text_content is not None else '')
             row_data.append(some_link) if some_link != None else None
         
         if row_data:
             data_rows.append(row_data)
 
     return process_race_data(data_rows)
+
+# Same rows, without re-parsing a calendar page whose content hasn't changed
+cached_parse_all_races = rc.memoized(parse_all_races)
+
+
+# Get final race results
+def get_all_races(year):
+    return mt.fetch_and_parse(year, "calendar", get_url(year), hc.get, cached_parse_all_races)
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import context as mp_context
+
+import aiohttp
+
+import all_race_data as ar
+import full_season_data as fs
+import http_client as hc
+import indiv_races_data as ir
+import metrics as mt
+import response_cache as rc
+import season_archive as sa
+import single_flight as sf
+
+logger = logging.getLogger(__name__)
+
+# Pages being fetched at once across all seasons (they all come from one host, so this matches
+# http_client's per-host cap). Any number of page tasks can be waiting for a slot, which is cheap.
+MAX_IN_FLIGHT = hc.MAX_CONNECTIONS_PER_HOST
+# Seasons being scraped at once: enough to keep MAX_IN_FLIGHT busy (a season has up to ~50 pages),
+# and few enough that each one is done, saved and unlocked soon after it starts
+SEASONS_IN_FLIGHT = 3
+TIMEOUT = aiohttp.ClientTimeout(sock_connect=hc.TIMEOUT[0], sock_read=hc.TIMEOUT[1])
+
+# Pages are parsed in worker processes so parsing isn't capped at one core by the GIL, one per core
+# next to the event loop's (0 parses on the event loop, the default on a single core)
+PARSE_WORKERS = int(os.environ.get("F1_PARSE_WORKERS", min((os.cpu_count() or 1) - 1, 8)))
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def new_session():
+    connector = aiohttp.TCPConnector(limit=MAX_IN_FLIGHT, limit_per_host=hc.MAX_CONNECTIONS_PER_HOST)
+    return aiohttp.ClientSession(connector=connector, timeout=TIMEOUT)
+
+
+# Async counterpart of http_client.get, with the same retry/backoff policy, status handling and response
+# cache (whose sqlite calls run in a worker thread, so they never hold up the other downloads)
+async def fetch(session, url, missing_ok=False):
+    cached = await asyncio.to_thread(rc.lookup, url)
+    for attempt in range(hc.MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(hc.BACKOFF_FACTOR * 2**(attempt-1))
+        try:
+            async with session.get(url, headers=rc.validators(cached)) as response:
+                if response.status == 304 and cached is not None:
+                    await asyncio.to_thread(rc.touch, url)
+                    return cached.body
+                if response.status in hc.RETRY_STATUSES and attempt < hc.MAX_RETRIES:
+                    continue
+                if response.status == 404 and missing_ok:
+                    return b""
+                if response.status != 200:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history, status=response.status,
+                        message=response.reason or "", headers=response.headers)
+                content = await response.read()
+                await asyncio.to_thread(rc.store, url, response.headers.get("ETag"), response.headers.get("Last-Modified"), content)
+                return content
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == hc.MAX_RETRIES:
+                raise
+
+
+# Parse workers start from a fork server where there is one (the app's process already has other
+# threads by then, the refresher's and streamlit's, so it isn't forked itself), spawned otherwise
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _WorkerProcess, _WorkerContext = mp_context.ForkServerProcess, mp_context.ForkServerContext
+else:
+    _WorkerProcess, _WorkerContext = mp_context.SpawnProcess, mp_context.SpawnContext
+_main_lock = threading.Lock()
+
+
+# A new process would run __main__ again as it starts, and under streamlit that's the app script
+# (streamlit installs it as __main__ for good), so a blank one stands in while a worker is launched
+class ParseWorker(_WorkerProcess):
+    def start(self):
+        with _main_lock:
+            main = sys.modules["__main__"]
+            sys.modules["__main__"] = types.ModuleType("__main__")
+            try:
+                super().start()
+            finally:
+                sys.modules["__main__"] = main
+
+
+class ParseContext(_WorkerContext):
+    Process = ParseWorker
+
+
+# Kept for the life of the process, so workers are only started once (the fork server
+# preloads this module, which brings in the parsers, instead of __main__)
+def get_parse_pool():
+    global _parse_pool
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                context = ParseContext()
+                if context.get_start_method() == "forkserver":
+                    context.set_forkserver_preload([__name__])
+                _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=context)
+    return _parse_pool
+
+
+# Runs a parser in the worker pool, unless the same content was parsed before
+# (a pool that lost a worker is replaced, and that page is parsed here instead)
+async def parse_in_pool(parse, content):
+    global _parse_pool
+    key = rc.memo_key(parse, content)
+    rows = rc.recall(key)
+    if rows is not None:
+        return rows
+    if PARSE_WORKERS > 0:
+        pool = get_parse_pool()
+        try:
+            rows = await asyncio.get_running_loop().run_in_executor(pool, parse, content)
+        except BrokenProcessPool:
+            logger.warning("Parse worker pool broke, starting a new one")
+            with _parse_pool_lock:
+                if _parse_pool is pool:
+                    _parse_pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+    if rows is None:
+        rows = parse(content)
+    rc.remember(key, rows)
+    return rows
+
+
+# Pages only download (and get timed) while they hold one of the limit's slots, and are parsed after
+# giving it back
+async def get_all_races(session, limit, year):
+    return await mt.async_fetch_and_parse(
+        year, "calendar", ar.get_url(year), lambda url: fetch(session, url),
+        lambda content: parse_in_pool(ar.parse_all_races, content), limit)
+
+
+async def get_race_data(session, limit, race_link, year):
+    kind = mt.page_kind(race_link)
+    return await mt.async_fetch_and_parse(
+        year, kind, ir.get_url(race_link, year), lambda url: fetch(session, url, missing_ok=kind == "sprint"),
+        lambda content: parse_in_pool(ir.parse_race_data, content), limit)
+
+
+# Fetches the season's outstanding race/sprint pages concurrently, then rebuilds it in race order
+# (if any page fails the rest of the season's fetches are cancelled). Planning and building read and write
+# the archive, so they run in a worker thread.
+async def get_season_data(session, limit, year):
+    races = await get_all_races(session, limit, year)
+    plan = await asyncio.to_thread(fs.make_season_plan, year, races)
+    links = fs.pages_to_fetch(plan)
+
+    async with asyncio.TaskGroup() as group:
+        tasks = [group.create_task(get_race_data(session, limit, link, year)) for link in links]
+
+    fetched = {link: task.result() for link, task in zip(links, tasks)}
+    return await asyncio.to_thread(fs.build_season_data, plan, fetched)
+
+
+# Scrapes and saves a season while holding its lock, unless another process saved it meanwhile
+# (see single_flight). The lock is only taken once the season gets one of the seasons slots, and
+# let go as soon as it's saved, so a batch never holds seasons it isn't working on. The archive's
+# sqlite calls run in a worker thread, like the response cache's.
+async def get_shared_season_data(session, limit, seasons, year, since):
+    async with seasons, sf.season_lock(year):
+        season = await asyncio.to_thread(sf.load_saved, year, since)
+        if season is None:
+            season = await get_season_data(session, limit, year)
+            await asyncio.to_thread(sa.save_season, year, season)
+        return season
+
+
+# Scrapes all the given seasons on one event loop, skipping (and logging) any season that fails
+async def scrape_seasons(years):
+    limit = asyncio.Semaphore(MAX_IN_FLIGHT)
+    seasons = asyncio.Semaphore(SEASONS_IN_FLIGHT)
+    since = time.time()
+    async with new_session() as session:
+        results = await asyncio.gather(
+            *(get_shared_season_data(session, limit, seasons, year, since) for year in years),
+            return_exceptions=True,
+        )
+
+    seasons = {}
+    for year, result in zip(years, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to scrape the %s season, skipping it", year, exc_info=result)
+            continue
+        if isinstance(result, BaseException):
+            raise result
+        seasons[year] = result
+    return seasons
+
+
+def run_scrape_seasons(years):
+    return asyncio.run(scrape_seasons(list(years)))
@@ -0,0 +1,101 @@
+# Per-page parse time of the results_table extractor vs the old BeautifulSoup html.parser path.
+#
+#   python benchmarks/bench_parse.py PAGE_OR_DIR [PAGE_OR_DIR ...] [--repeat N]
+#
+# Pages are saved formula1.com results pages; a page whose parent folder is named "races"
+# (e.g. 2024/races/index.html) is treated as a season calendar, anything else as a race/sprint result.
+# Needs bs4 installed for the old path, and checks both paths produce the same rows.
+import argparse
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import all_race_data as ar
+import indiv_races_data as ir
+
+
+# The pre-extractor parsing code, kept here as the baseline
+def fix_text(text):
+    return text.replace('\\xc2\\xa0', ' ').encode('utf-8').decode('unicode_escape').encode('latin-1').decode('utf-8')
+
+
+def old_parse_all_races(content):
+    soup = BeautifulSoup(str(content), "html.parser")
+    data_rows = []
+    for tr in soup.find_all('tr')[1:]:
+        row_data = []
+        for td in tr.find_all('td'):
+            text_ele = td.find('p')
+            some_link = td.find('a')['href'] if td.find('a') != None else None
+            row_data.append(fix_text(str(text_ele.get_text(strip=True))))
+            row_data.append(some_link) if some_link != None else None
+        if row_data:
+            data_rows.append(row_data)
+    return ar.process_race_data(data_rows)
+
+
+def old_parse_race_data(content):
+    soup = BeautifulSoup(str(content), "html.parser")
+    data_rows = []
+    for tr in soup.find_all('tr')[1:]:
+        row_data = []
+        for td in tr.find_all('td'):
+            text_ele = td.find('p')
+            row_data.append(fix_text(text_ele.get_text(strip=True)) if text_ele else '')
+        if row_data:
+            data_rows.append(row_data)
+    data_rows = [row for row in data_rows if len(row) != 1]
+    data_rows = [row[:2] + [(row[2][:-3], row[2][-3:])] + row[3:] for row in data_rows]
+    keys = ["pos", "num", "driver", "team", "laps", "time", "pts"]
+    return [dict(zip(keys, row)) for row in data_rows]
+
+
+def find_pages(paths):
+    pages = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                pages += [os.path.join(root, f) for f in files if f.endswith(".html")]
+        else:
+            pages.append(path)
+    return sorted(pages)
+
+
+def time_per_call(func, content, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(content)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse time per results page, old vs new")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    total_old = total_new = 0
+    print(f"{'page':<60} {'KiB':>7} {'old ms':>8} {'new ms':>8} {'speedup':>8}  same rows")
+    for page in find_pages(args.paths):
+        with open(page, "rb") as f:
+            content = f.read()
+
+        is_calendar = os.path.basename(os.path.dirname(page)) == "races"
+        old, new = (old_parse_all_races, ar.parse_all_races) if is_calendar else (old_parse_race_data, ir.parse_race_data)
+
+        old_s = time_per_call(old, content, args.repeat)
+        new_s = time_per_call(new, content, args.repeat)
+        total_old += old_s
+        total_new += new_s
+        same = old(content) == [row if is_calendar else row._asdict() for row in new(content)]
+        print(f"{page[-60:]:<60} {len(content)/1024:>7.1f} {old_s*1000:>8.2f} {new_s*1000:>8.2f} {old_s/new_s:>7.1f}x  {same}")
+
+    if total_new:
+        print(f"{'total':<60} {'':>7} {total_old*1000:>8.2f} {total_new*1000:>8.2f} {total_old/total_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
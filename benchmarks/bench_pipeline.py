@@ -0,0 +1,217 @@
+# Times every stage of the results pipeline over a recorded corpus (see corpus.py) served from localhost.
+#
+#   python benchmarks/bench_pipeline.py CORPUS_DIR [--repeat N] [--json OUT] [--compare BASELINE.json]
+#
+# Each stage reports its median wall time, throughput and peak traced memory. Save a run with --json
+# and pass it to --compare on a later run to see what changed.
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Scraped seasons go to a throwaway archive so every run really goes through the pipeline
+BENCH_CACHE_DIR = tempfile.mkdtemp(prefix="f1-bench-")
+os.environ["F1_CACHE_DIR"] = BENCH_CACHE_DIR
+os.environ["F1_SNAPSHOT"] = os.path.join(BENCH_CACHE_DIR, "no-snapshot.bin")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import corpus
+
+import all_race_data as ar
+import chart_options as co
+import full_season_data as fs
+import http_client as hc
+import indiv_races_data as ir
+import leaderboard as lb
+import metrics as mt
+import response_cache as rc
+import rescoring as rs
+import season_model as sm
+import team_colors as tc
+
+
+def corpus_years(corpus_dir):
+    return sorted(int(name) for name in os.listdir(corpus_dir) if name.isdigit())
+
+
+# Removes the archive and caches (and the lock files of single_flight)
+def clear_archive():
+    rc.close()
+    for name in os.listdir(BENCH_CACHE_DIR):
+        path = os.path.join(BENCH_CACHE_DIR, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+# Run (untimed) before every run of the stages that fetch: with nothing in the archive, the response
+# cache or the parse memo, each run times full downloads and parses instead of 304s and memo hits
+def cold_start():
+    clear_archive()
+    rc.forget_parsed()
+
+
+# Runs every stage once to get the inputs of the next one
+def prepare(years):
+    inputs = {}
+    for year in years:
+        plan = fs.make_season_plan(year, ar.get_all_races(year))
+        fetched = {link: ir.get_race_data(link, year) for link in fs.pages_to_fetch(plan)}
+        num_races = len(plan["race_links"])
+        model, tricode_to_driver, driver_to_team = fs.get_raw_results(num_races, plan["race_links"], year, fetched=fetched)
+        indiv_pts_results, team_pts_results = fs.get_full_results(model)
+        season = fs.build_season_data(plan, fetched)
+        inputs[year] = {
+            "plan": plan, "fetched": fetched, "num_races": num_races,
+            "team_pts_results": team_pts_results, "season": season, "model": model,
+        }
+    clear_archive()
+    return inputs
+
+
+# Every stage is (name, unit, function, setup) where the function runs the stage over all years and
+# returns how many units it processed (setup, if any, runs untimed before each run)
+def stages(years, inputs):
+    def get_all_races():
+        for year in years:
+            ar.get_all_races(year)
+        return len(years)
+
+    def get_race_data():
+        count = 0
+        for year in years:
+            for link in fs.pages_to_fetch(inputs[year]["plan"]):
+                ir.get_race_data(link, year)
+                count += 1
+        return count
+
+    def process_race_results():
+        count = 0
+        for year in years:
+            i = inputs[year]
+            fs.get_raw_results(i["num_races"], i["plan"]["race_links"], year, fetched=i["fetched"])
+            count += len(i["fetched"])
+        return count
+
+    def get_full_results():
+        for year in years:
+            fs.get_full_results(inputs[year]["model"])
+        return len(years)
+
+    def adjust_team_names():
+        for year in years:
+            fs.adjust_team_names(dict(inputs[year]["team_pts_results"]))
+        return len(years)
+
+    # Just the corpus years (the others would only be 404s), counting the pages the refresh fetched
+    def get_all_data():
+        fs.get_all_data(years)
+        return mt.last_refresh().summary()["pages"]
+
+    def chart_options():
+        for year in years:
+            (tricode_to_driver, indiv_pts_results, team_pts_results, team_name_change,
+             teams_with_drivers, driver_team_info, race_locations) = inputs[year]["season"]
+            team_colors = tc.all_team_colors[year]
+            co.drivers_option(year, indiv_pts_results, driver_team_info, race_locations, team_colors)
+            co.constructors_option(year, team_pts_results, race_locations, team_colors)
+            # The leaderboards after the last round, the way the app builds them
+            drivers = sm.RoundStandings(indiv_pts_results)
+            teams = sm.RoundStandings(team_pts_results)
+            lb.leaderboard_html(lb.round_rows(drivers.at(drivers.num_rounds() - 1),
+                                              lambda driver: team_colors[driver_team_info[driver]], short=True))
+            lb.leaderboard_html(lb.round_rows(teams.at(teams.num_rounds() - 1), lambda team: team_colors[team]))
+        return len(years)
+
+    def round_standings():
+        for year in years:
+            season = inputs[year]["season"]
+            for results in (season[1], season[2]):
+                standings = sm.RoundStandings(results)
+                for round_index in range(standings.num_rounds()):
+                    standings.at(round_index)
+        return len(years)
+
+    def rescore_all():
+        models = {year: inputs[year]["model"] for year in years}
+        rs.rescore_all(models, rs.TOP_10, sprints=True, fastest_lap=True)
+        return len(years)
+
+    return [
+        ("get_all_races", "pages", get_all_races, cold_start),
+        ("get_race_data", "pages", get_race_data, cold_start),
+        ("process_race_results", "pages", process_race_results, None),
+        ("get_full_results", "seasons", get_full_results, None),
+        ("adjust_team_names", "seasons", adjust_team_names, None),
+        ("get_all_data", "pages", get_all_data, cold_start),
+        ("chart_options", "seasons", chart_options, None),
+        ("round_standings", "seasons", round_standings, None),
+        ("rescore_all", "seasons", rescore_all, None),
+    ]
+
+
+def measure(func, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        count = func()
+        times.append(time.perf_counter() - start)
+
+    # Separate run for memory, tracing slows everything down
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    seconds = statistics.median(times)
+    return {"count": count, "median_ms": seconds * 1000, "per_second": count / seconds, "peak_kib": peak / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage benchmark of the results pipeline")
+    parser.add_argument("corpus")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results of an earlier run (from --json) to compare against")
+    args = parser.parse_args()
+
+    server, hc.BASE_URL = corpus.serve(args.corpus)
+    years = corpus_years(args.corpus)
+    try:
+        inputs = prepare(years)
+        results = {name: dict(measure(func, args.repeat, setup), unit=unit) for name, unit, func, setup in stages(years, inputs)}
+    finally:
+        server.shutdown()
+        shutil.rmtree(BENCH_CACHE_DIR, ignore_errors=True)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["stages"]
+
+    print(f"{len(years)} seasons ({years[0]}-{years[-1]}), median of {args.repeat}")
+    print(f"{'stage':<22} {'median ms':>10} {'throughput':>20} {'peak KiB':>10} {'vs baseline':>12}")
+    for name, r in results.items():
+        change = ""
+        if name in baseline:
+            change = f"{(r['median_ms'] / baseline[name]['median_ms'] - 1) * 100:+.0f}%"
+        throughput = f"{r['per_second']:.0f} {r['unit']}/s"
+        print(f"{name:<22} {r['median_ms']:>10.1f} {throughput:>20} {r['peak_kib']:>10.0f} {change:>12}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"years": years, "repeat": args.repeat, "stages": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Recorded formula1.com results pages for the benchmarks, and a local server that plays them back.
+#
+#   python benchmarks/corpus.py record CORPUS_DIR [FIRST_YEAR LAST_YEAR]   # needs network, run once
+#   python benchmarks/corpus.py serve CORPUS_DIR [PORT]
+#
+# Pages are stored by url path below the results base url, e.g. CORPUS_DIR/2024/races/index.html
+# for a season calendar and CORPUS_DIR/2024/races/1229/bahrain/race-result/index.html for a result page.
+import functools
+import http.server
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import all_race_data as ar
+import full_season_data as fs
+import http_client as hc
+import indiv_races_data as ir
+
+URL_PREFIX = "/en/results"
+
+
+def page_path(corpus_dir, url):
+    return os.path.join(corpus_dir, url[len(hc.BASE_URL):].strip("/"), "index.html")
+
+
+# Pages that are missing (races without a sprint) aren't saved, so they're 404s when played back too
+def save_page(corpus_dir, url, missing_ok=False):
+    content = hc.get(url, missing_ok)
+    if not content:
+        return content
+    path = page_path(corpus_dir, url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    return content
+
+
+def record(corpus_dir, first_year=fs.FIRST_YEAR, last_year=fs.LAST_YEAR):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for year in range(int(first_year), int(last_year)+1):
+            races = ar.parse_all_races(save_page(corpus_dir, ar.get_url(year)))
+            links = []
+            for race in races:
+                links.append(race[1])
+                if year >= fs.SPRINT_START:
+                    links.append(fs.sprint_link(race[1]))
+            list(executor.map(lambda link: save_page(corpus_dir, ir.get_url(link, year), "sprint-results" in link), links))
+            print(f"{year}: {len(links) + 1} pages")
+
+
+class CorpusHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def translate_path(self, path):
+        if not path.startswith(URL_PREFIX):
+            return ""
+        return os.path.join(super().translate_path(path[len(URL_PREFIX):]), "index.html")
+
+
+class CorpusServer(http.server.ThreadingHTTPServer):
+    request_queue_size = 256  # the default backlog of 5 drops connections when scrapers fan out
+    daemon_threads = True
+
+
+# Serves the corpus on localhost from a background thread, returns (server, base url for http_client)
+def serve(corpus_dir, port=0):
+    handler = functools.partial(CorpusHandler, directory=corpus_dir)
+    server = CorpusServer(("127.0.0.1", int(port)), handler)
+    threading.Thread(target=server.serve_forever, name="corpus-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}{URL_PREFIX}"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("record", "serve"):
+        sys.exit("usage: python benchmarks/corpus.py record|serve CORPUS_DIR [...]")
+    if sys.argv[1] == "record":
+        record(*sys.argv[2:5])
+    else:
+        server, base_url = serve(*sys.argv[2:4])
+        print(f"Serving {sys.argv[2]} at {base_url} (set F1_BASE_URL to it)")
+        threading.Event().wait()
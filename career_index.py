@@ -0,0 +1,65 @@
+# Cross-season index over a season store: every driver's and every constructor lineage's seasons,
+# pointing straight at the per-season [cumulative, per race] points lists (nothing is copied)
+import team_identity as ti
+
+
+class CareerSeason:
+    __slots__ = ("year", "team", "points")
+
+    def __init__(self, year, team, points):
+        self.year = year
+        self.team = team
+        self.points = points  # the season's [cumulative, per race] lists
+
+    def total(self):
+        return self.points[0][-1] if self.points[0] else 0
+
+
+class CareerIndex:
+    __slots__ = ("drivers", "tricodes", "constructors")
+
+    def __init__(self, drivers, tricodes, constructors):
+        self.drivers = drivers  # driver -> (CareerSeason, ...) in year order
+        self.tricodes = tricodes  # tricode -> (driver, ...), since tricodes get reused across eras
+        self.constructors = constructors  # lineage -> (CareerSeason, ...) in year order
+
+    def driver(self, name):
+        return self.drivers.get(name, ())
+
+    def drivers_with_tricode(self, tricode):
+        return self.tricodes.get(tricode, ())
+
+    def constructor(self, lineage_name):
+        return self.constructors.get(lineage_name, ())
+
+
+def build(store):
+    drivers, tricodes, constructors = {}, {}, {}
+    for year in store.years():
+        (tricode_to_driver, indiv_pts_results, team_pts_results, team_name_change,
+         teams_with_drivers, driver_team_info, race_locations) = store.season(year)
+        for driver, points in indiv_pts_results.items():
+            drivers.setdefault(driver, []).append(CareerSeason(year, driver_team_info.get(driver), points))
+        for tricode, driver in tricode_to_driver.items():
+            names = tricodes.setdefault(tricode, [])
+            if driver not in names:
+                names.append(driver)
+        for team, points in team_pts_results.items():
+            constructors.setdefault(ti.lineage(team, year), []).append(CareerSeason(year, team, points))
+
+    def frozen(index):
+        return {key: tuple(values) for key, values in index.items()}
+    return CareerIndex(frozen(drivers), frozen(tricodes), frozen(constructors))
+
+
+# Career points over the seasons, as (year, points that season, career total after it)
+def career_totals(seasons):
+    rows = []
+    total = 0
+    for season in seasons:
+        total += season.total()
+        if rows and rows[-1][0] == season.year:  # two entries of one lineage in the same season
+            rows[-1] = (season.year, rows[-1][1] + season.total(), total)
+        else:
+            rows.append((season.year, season.total(), total))
+    return rows
@@ -0,0 +1,141 @@
+# ECharts options for the standings charts.
+# Every series reads from one shared dataset with a row per race: [race index, points, "(+change)", points, "(+change)", ...]
+# (two columns per team/driver), and the race locations are only stored once on the x-axis
+
+
+def standings_dataset(pts_results, num_races):
+    dimensions = ["race"]
+    source = [[i] for i in range(num_races)]
+    for name, (cumulative, delta) in pts_results.items():
+        dimensions += [name, f"{name} (+)"]
+        for i in range(num_races):
+            source[i] += [cumulative[i], f"(+{delta[i]})"]
+    return {"dimensions": dimensions, "source": source}
+
+
+# Points column of the i-th team/driver in the shared dataset (its change column is the one after)
+def points_column(i):
+    return 1 + 2*i
+
+
+def series_config(name, column, color, end_label):
+    return {
+        "type": "line",
+        "showSymbol": True,
+        "name": name,
+        "endLabel": end_label,
+        "labelLayout": {"moveOverlap": "shiftY"},
+        "emphasis": {"focus": "series"},
+        "encode": {
+            "x": 0,
+            "y": column,
+            "tooltip": [column, column + 1]
+        },
+        "itemStyle": {
+            "color": color
+        }
+    }
+
+
+def x_axis(race_locations, font_size):
+    return {
+        "type": "category",
+        "nameLocation": "middle",
+        "axisLabel": {
+            "rotate": 45,  # Rotating race location labels 45 degrees
+            "formatter": "{value}",
+            "fontSize": font_size,
+            "fontWeight": "bold"
+        },
+        "data": race_locations
+    }
+
+
+def constructors_option(year, team_pts_results, race_locations, team_colors):
+    series_list = [
+        series_config(team, points_column(i), team_colors[team], {
+            "show": True,
+            "formatter": "{@[%d]}" % points_column(i) + f" - {team}",
+            "fontSize": 12,
+            "textBorderColor": team_colors[team],  # Team-dependent color
+            "textBorderWidth": 2,
+            "color": "black",
+        })
+        for i, team in enumerate(team_pts_results)
+    ]
+
+    return {
+        "animationDuration": 500,
+        "dataset": standings_dataset(team_pts_results, len(race_locations)),
+        "title": {"text": f"Year: {year}"},
+        "tooltip": {
+            "trigger": "axis",
+        },
+        "xAxis": x_axis(race_locations, 11),
+        "yAxis": {"name": "Points"},
+        "grid": {"right": 100},
+        "series": series_list,
+    }
+
+
+def drivers_option(year, indiv_pts_results, drivers_to_team, race_locations, team_colors):
+    series_list = [
+        series_config(driver, points_column(i), team_colors[drivers_to_team[driver]], {
+            "show": False,
+            "formatter": "{@[%d]}" % points_column(i) + f" - {driver}",
+        })
+        for i, driver in enumerate(indiv_pts_results)
+    ]
+
+    return {
+        "animationDuration": 500,
+        "dataset": standings_dataset(indiv_pts_results, len(race_locations)),
+        "title": {"text": f"Year: {year}"},
+        "tooltip": {
+            "show": True,
+            "trigger": "item",
+        },
+        "xAxis": x_axis(race_locations, 10),
+        "yAxis": {"name": "Points"},
+        "grid": {"right": 100},
+        "series": series_list,
+    }
+
+
+# Career points across seasons, one row per season: [year, career total, "(+season points)", ...]
+# (None where that driver/lineage didn't race, so the line just skips the season)
+def career_option(title, careers, colors):
+    import career_index as ci
+    years = sorted({season.year for seasons in careers.values() for season in seasons})
+    row_of = {year: i for i, year in enumerate(years)}
+    dimensions = ["season"]
+    source = [[year] for year in years]
+    for name, seasons in careers.items():
+        dimensions += [name, f"{name} (+)"]
+        for row in source:
+            row += [None, None]
+        for year, season_points, total in ci.career_totals(seasons):
+            source[row_of[year]][-2:] = [total, f"(+{season_points})"]
+
+    series_list = []
+    for i, name in enumerate(careers):
+        series = series_config(name, points_column(i), colors[name], {
+            "show": True,
+            "formatter": "{@[%d]}" % points_column(i) + f" - {name}",
+            "fontSize": 12,
+        })
+        series["connectNulls"] = True
+        series_list.append(series)
+
+    return {
+        "animationDuration": 500,
+        "dataset": {"dimensions": dimensions, "source": source},
+        "title": {"text": title},
+        "tooltip": {
+            "trigger": "item",
+        },
+        "xAxis": x_axis([str(year) for year in years], 11),
+        "yAxis": {"name": "Career points"},
+        "grid": {"right": 160},
+        "series": series_list,
+    }
@@ -0,0 +1,192 @@
+# Headless data service: one process owns the scraping, the archive and the refresher and serves the
+# seasons as JSON, so any number of dashboard replicas (started with F1_DATA_SERVICE=http://host:port)
+# share one scraper instead of each running its own.
+#
+#   python data_service.py [--host HOST] [--port PORT]
+#
+#   GET /seasons          {"years": [...], "versions": {year: version}} of what can be asked for / is loaded
+#   GET /seasons/<year>   {"year", "version", "season"} with the season's 7-tuple (full_season_data.get_season_data),
+#                         ETag'd by its version, so a replica that's up to date just gets a 304
+#   GET /models/<year>    the season's SeasonModel.to_bytes() for re-scoring (404 if its positions aren't available)
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import season_store as ss
+
+logger = logging.getLogger(__name__)
+
+SERVICE_URL = os.environ.get("F1_DATA_SERVICE", "").rstrip("/")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8600
+TIMEOUT = (2, 120)  # (connect, read) seconds, reads wait for a season that's still being scraped
+REVALIDATE_INTERVAL = 10  # seconds a replica serves its copy of a season before asking the service again
+
+SEASON_PATH = re.compile(r"^/(seasons|models)/(\d{4})$")
+
+
+_payloads = {}  # year -> (version, etag, json body, gzipped body), encoded once per version
+_payloads_lock = threading.Lock()
+
+
+def season_payload(year):
+    import refresher as rf
+    version, season = rf.get(year)
+    with _payloads_lock:
+        cached = _payloads.get(year)
+    if cached is not None and cached[0] == version:
+        return cached
+    body = json.dumps({"year": year, "version": version, "season": season}).encode()
+    payload = (version, f'"{year}-{version!r}"', body, gzip.compress(body, 6))
+    with _payloads_lock:
+        _payloads[year] = payload
+    return payload
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        import full_season_data as fs
+        if self.path == "/seasons":
+            store = ss.current()
+            body = json.dumps({
+                "years": list(range(fs.FIRST_YEAR, fs.LAST_YEAR+1)),
+                "versions": {year: store.version(year) for year in store.years()},
+            }).encode()
+            return self.send_body(200, "application/json", body)
+
+        match = SEASON_PATH.match(self.path)
+        year = int(match.group(2)) if match else None
+        if year is None or not fs.FIRST_YEAR <= year <= fs.LAST_YEAR:
+            return self.send_body(404, "text/plain", b"Not found")
+        try:
+            version, etag, body, gzipped = season_payload(year)
+        except Exception:
+            logger.exception("Loading the %s season failed", year)
+            return self.send_body(503, "text/plain", f"The {year} season isn't available".encode())
+
+        if match.group(1) == "models":
+            return self.send_model(year, etag)
+        if self.headers.get("If-None-Match") == etag:
+            return self.send_body(304, None, b"", etag)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            return self.send_body(200, "application/json", gzipped, etag, "gzip")
+        return self.send_body(200, "application/json", body, etag)
+
+    # Positions are saved along with the season, so they share its ETag
+    def send_model(self, year, etag):
+        import rescoring as rs
+        model_etag = etag[:-1] + '-model"'
+        if self.headers.get("If-None-Match") == model_etag:
+            return self.send_body(304, None, b"", model_etag)
+        model = rs.get_model(year)
+        if model is None:
+            return self.send_body(404, "text/plain", f"No positions for the {year} season".encode())
+        return self.send_body(200, "application/octet-stream", model.to_bytes(), model_etag)
+
+    def send_body(self, status, content_type, body, etag=None, encoding=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        if etag:
+            self.send_header("ETag", etag)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info("%s " + format, self.address_string(), *args)
+
+
+# Loads every season in the background (unless there's a snapshot to boot from) and keeps them fresh
+def start_loading():
+    import full_season_data as fs
+    import refresher as rf
+    import snapshot as sn
+    rf.start()
+    if not sn.has_snapshot():
+        threading.Thread(target=fs.get_all_data, name="season-prefetch", daemon=True).start()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    start_loading()
+    logger.info("Serving seasons on http://%s:%s", *server.server_address[:2])
+    server.serve_forever()
+
+
+# Client side, used by the dashboard when SERVICE_URL is set
+_session = None
+_seasons = {}  # year -> (checked at, version, season, etag)
+_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+    return _session
+
+
+# (version, season 7-tuple) for the year, like refresher.get but from the service. Seasons are kept and
+# revalidated every REVALIDATE_INTERVAL, and newer versions are published to the local season store.
+# The last good copy is kept if the service can't be reached.
+def get(year):
+    with _lock:
+        cached = _seasons.get(year)
+    now = time.monotonic()
+    if cached is not None and now - cached[0] < REVALIDATE_INTERVAL:
+        return cached[1], cached[2]
+
+    headers = {"If-None-Match": cached[3]} if cached else {}
+    try:
+        response = get_session().get(f"{SERVICE_URL}/seasons/{year}", headers=headers, timeout=TIMEOUT)
+    except requests.RequestException as e:
+        if cached is None:
+            raise RuntimeError(f"Could not reach the data service for the {year} season") from e
+        logger.warning("Data service unreachable, still serving the %s season from %s", year, cached[1])
+        response = None
+
+    if response is not None and response.status_code == 200:
+        payload = response.json()
+        cached = (now, payload["version"], tuple(payload["season"]), response.headers.get("ETag"))
+        ss.publish({year: cached[2]})
+    elif response is not None and response.status_code != 304 and cached is None:
+        raise RuntimeError(f"The data service has no {year} season (HTTP {response.status_code})")
+    else:
+        cached = (now,) + cached[1:]
+
+    with _lock:
+        _seasons[year] = cached
+    return cached[1], cached[2]
+
+
+# The season's SeasonModel from the service, or None if it doesn't have its positions
+def get_model(year):
+    import season_model as sm
+    response = get_session().get(f"{SERVICE_URL}/models/{year}", timeout=TIMEOUT)
+    if response.status_code != 200:
+        return None
+    return sm.SeasonModel.from_bytes(response.content)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the F1 seasons to dashboard replicas")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    serve(args.host, args.port)
@@ -1,149 +1,90 @@
-from concurrent.futures import ThreadPoolExecutor
+import time
 
-import all_race_data as ar
 import indiv_races_data as ir
+import metrics as mt
+import season_archive as sa
+import season_model as sm
+import season_store as ss
 import team_colors as tc
+import team_identity as ti
+
+FIRST_YEAR = 2000
+LAST_YEAR = 2025
+SPRINT_START = 2021  # Sprints started in 2021
+# Rounds already ingested that a refresh fetches again, to pick up results amended after the race
+# (penalties, disqualifications), which costs a 304 if they haven't changed
+REFETCH_ROUNDS = 1
 
 all_team_colors = tc.all_team_colors
-all_tricodes_to_driver = {}
-all_indiv_pts_results = {}
-all_team_pts_results = {}
-all_team_name_changes = {}
-all_teams_to_driver = {}
-all_drivers_to_team = {}
-all_race_locations = {}
 
 
-def process_race_results(driver_results, tricode_to_driver, driver_to_team, race, race_num, num_races):
+# Folds a results page into the season model, parsing each row's strings once on the way in
+def process_race_results(model, tricode_to_driver, driver_to_team, race, race_num, sprint=False):
+    entries, positions, points = [], [], []
     for data in race:
-        tricode = data["driver"][1]
-        name = data["driver"][0]
-        driver_team = f"{tricode}-{data['team']}"
-        pts_pos = [(data["pos"], data["pts"])]
-        if driver_team not in driver_results:
-            driver_results[driver_team] = [None]*num_races
-        if driver_results[driver_team][race_num] is None:
-            driver_results[driver_team][race_num] = pts_pos
-        else:
-            driver_results[driver_team][race_num].append(pts_pos[0])
+        name, tricode = data.driver
+        entries.append((name, data.team))
+        positions.append(data.pos)
+        points.append(data.pts)
         tricode_to_driver[tricode] = name
-        driver_to_team[name] = data['team']
+        driver_to_team[name] = data.team
+    model.add_results(race_num, entries, positions, points, sprint)
+
+    return model, tricode_to_driver, driver_to_team
+
+
+def sprint_link(race_link):
+    return race_link.replace("race-result", "sprint-results")
+
 
-    return driver_results, tricode_to_driver, driver_to_team
+# Processes rounds start_race onwards, folding them into previously ingested results if given
+# (rounds that were ingested before are replaced)
+# (pages already downloaded by the scheduler are taken from fetched, anything else is fetched here)
+def get_raw_results(num_races, race_links, year, previous=None, start_race=0, fetched=None):
+    model, tricode_to_driver, driver_to_team = previous if previous else (sm.SeasonModel.empty(num_races), {}, {})
+    fetched = fetched if fetched is not None else {}
 
+    def race_data(link):
+        return fetched[link] if link in fetched else ir.get_race_data(link, year)
 
-def get_raw_results(num_races, race_links, year):
-    driver_results = {}
-    tricode_to_driver = {}
-    driver_to_team = {}
+    # Make room for the rounds that were added since the last refresh
+    model.extend_rounds(num_races)
 
-    for race_num in range(num_races):
-        normal_race = ir.get_race_data(race_links[race_num], year)
-        indiv_race_data = process_race_results(driver_results, tricode_to_driver, driver_to_team, normal_race, race_num, num_races)
-        driver_results, tricode_to_driver, driver_to_team = indiv_race_data
-        
-        if year < 2021:  # Sprints started in 2021
+    for race_num in range(start_race, num_races):
+        model.clear_round(race_num)
+        normal_race = race_data(race_links[race_num])
+        if not normal_race and sa.is_complete(year):
+            raise ValueError(f"The {year} season's {race_links[race_num]} page has no results")
+        process_race_results(model, tricode_to_driver, driver_to_team, normal_race, race_num)
+
+        if year < SPRINT_START:
             continue
 
-        sprint_race = ir.get_race_data(race_links[race_num].replace("race-result", "sprint-results"), year)
-        sprint_race_data = process_race_results(driver_results, tricode_to_driver, driver_to_team, sprint_race, race_num, num_races)
-        driver_results, tricode_to_driver, driver_to_team = sprint_race_data
-        
-    return driver_results, tricode_to_driver, driver_to_team
-
-
-def get_full_results(driver_results, tricode_to_driver, num_races):
-    indiv_pts_results = {}
-    team_pts_results = {}
-    for tricode_team in driver_results:
-        szn_results = driver_results[tricode_team]
-        driver = tricode_to_driver[tricode_team[:3]]
-        team = tricode_team[4:]
-
-        for race_num in range(len(szn_results)):
-            race_result = szn_results[race_num]
-            if race_result is None:
-                continue
-
-            pts = float(race_result[0][1])
-            pos = [race_result[0][0]]
-            if len(race_result) > 1:
-                pts += float(race_result[1][1])
-                pos.append(race_result[1][0])
-
-            if driver not in indiv_pts_results:
-                indiv_pts_results[driver] = [None]*num_races
-            indiv_pts_results[driver][race_num] = pts
-
-            if team not in team_pts_results:
-                team_pts_results[team] = [0]*num_races
-            team_pts_results[team][race_num] += pts
-
-    for driver in indiv_pts_results:
-        race_pts = [pts if pts is not None else 0 for pts in indiv_pts_results[driver]]
-        delta = [race_pts[0]] + [0]*(num_races-1)
-        for race_num in range(1, num_races):
-            delta[race_num] = race_pts[race_num]
-            race_pts[race_num] += race_pts[race_num-1]
-        indiv_pts_results[driver] = [race_pts, delta]
-
-    for team in team_pts_results:
-        team_pts = team_pts_results[team]
-        delta = [team_pts[0]] + [0]*(num_races-1)
-        for race_num in range(1, num_races):
-            delta[race_num] = team_pts[race_num]
-            team_pts[race_num] += team_pts[race_num-1]
-        team_pts_results[team] = [team_pts, delta]
-
-    def remove_decimals(list):
-        return [int(n) if (float(n)).is_integer() else n for n in list]
-
-    indiv_pts_results = {k:[remove_decimals(v[0]), remove_decimals(v[1])] for k,v in indiv_pts_results.items()}
-    team_pts_results = {k:[remove_decimals(v[0]), remove_decimals(v[1])] for k,v in team_pts_results.items()}
+        sprint_race = race_data(sprint_link(race_links[race_num]))
+        process_race_results(model, tricode_to_driver, driver_to_team, sprint_race, race_num, sprint=True)
+
+    return model, tricode_to_driver, driver_to_team
+
+
+def get_full_results(model):
+    indiv_pts_results = sm.running_totals(model.drivers, model.driver_points())
+    team_pts_results = sm.running_totals(model.teams, model.team_points())
 
     return indiv_pts_results, team_pts_results
 
 
+# Renames teams to their canonical names (see team_identity), single-word teams stay where they
+# are and renamed teams move to the end
 def adjust_team_names(team_pts_results):
     team_name_change = {}
-
-    # converts team names from 2000-2025
-    names_to_remove = ["Ferrari", "Mercedes", "Renault", "Honda", "RBPT", 
-                    "Cosworth", "Toyota", "BMW", "Petronas", "Ford",
-                    "Asiatech", "Peugeot", "Scuderia", "Racing", "TAG", 
-                    "Heuer", "BWT", "Aramco", "Kick", "European", "Acer",
-                    "Playlife", "Fondmetal", "Mugen", "Supertec"]
-    keys_to_del = []
     teams_to_add = {}
-    for key in team_pts_results:
-        names = key.split(" ")
-        if len(names) == 1:
-            team_name_change[names[0]] = names[0]
-            continue
-        team_results = team_pts_results[key]
-        keys_to_del.append(key)
-
-        for i in range(len(names)):
-            if names[i] == "Racing" and i==0:
-                continue
-            if names[i] in names_to_remove:
-                names[i] = None
-        team_name = " ".join([n for n in names if n is not None])
-        
-        if team_name == "RBR":
-            team_name = "Red Bull"
-        if team_name == "STR":
-            team_name = "Toro Rosso"
-        
+    for key in list(team_pts_results):
+        team_name = ti.canonical_name(key)
         team_name_change[key] = team_name
-        teams_to_add[team_name] = team_results
-
-    for key in keys_to_del:
-        del team_pts_results[key]
-    team_pts_results.update(teams_to_add) 
+        if " " in key:
+            teams_to_add[team_name] = team_pts_results.pop(key)
+    team_pts_results.update(teams_to_add)
 
-    
-    
     return team_pts_results, team_name_change
 
 def get_teams_with_drivers(driver_team_info):
@@ -155,71 +96,117 @@ def get_teams_with_drivers(driver_team_info):
     return teams_with_drivers
 
 
-def get_season_data(year):
-    races = ar.get_all_races(year)
-
-    race_locations = [r[0] for r in races]
+# Season calendar plus whatever is already ingested for it, i.e. everything needed to know which pages to fetch
+def make_season_plan(year, races):
+    if not races and sa.is_complete(year):
+        raise ValueError(f"The {year} calendar has no races")
     race_links = [r[1] for r in races]
 
+    # Picks up from the rounds already ingested on an earlier refresh (if the calendar still lines up).
+    # A finished season is built in full once, when it's sealed, whatever was ingested while it was live.
+    state = None if sa.is_complete(year) else sa.load_live_state(year)
+    if state is not None and state["race_links"] != race_links[:len(state["race_links"])]:
+        state = None
+    if state is not None:
+        state["model"] = sa.load_model(year)
+        if state["model"] is None:
+            state = None
+
+    return {
+        "year": year,
+        "race_locations": [r[0] for r in races],
+        "race_links": race_links,
+        "start_race": max(len(state["race_links"]) - REFETCH_ROUNDS, 0) if state else 0,
+        "state": state,
+    }
+
+
+# Race and sprint pages the season still needs, in race order
+def pages_to_fetch(plan):
+    links = []
+    for link in plan["race_links"][plan["start_race"]:]:
+        links.append(link)
+        if plan["year"] >= SPRINT_START:
+            links.append(sprint_link(link))
+    return links
+
+
+def build_season_data(plan, fetched=None):
+    start = time.perf_counter()
+    year = plan["year"]
+    race_locations = plan["race_locations"]
+    race_links = plan["race_links"]
+    start_race = plan["start_race"]
+    state = plan["state"]
+
     num_races = len(race_links) 
-    driver_results, tricode_to_driver, driver_to_team = get_raw_results(num_races, race_links, year)
-    indiv_pts_results, team_pts_results = get_full_results(driver_results, tricode_to_driver, num_races)
+    previous = None
+    if state:
+        previous = (sm.SeasonModel.from_bytes(state["model"]), state["tricode_to_driver"], state["driver_to_team"])
+
+    model, tricode_to_driver, driver_to_team = get_raw_results(num_races, race_links, year, previous, start_race, fetched)
+    indiv_pts_results, team_pts_results = get_full_results(model)
+    sa.save_model(year, model.to_bytes())
+
+    # The ingested results themselves are the model saved above
+    if not sa.is_complete(year):
+        sa.save_live_state(year, {
+            "race_links": race_links,
+            "tricode_to_driver": tricode_to_driver,
+            "driver_to_team": driver_to_team,
+        })
+    else:
+        sa.delete_live_state(year)
+
     team_pts_results, team_name_change = adjust_team_names(team_pts_results)
 
-    def sort_by_points(sort_this):
-        return dict(sorted(sort_this.items(), key=lambda item: item[1][0][-1], reverse=True))
-    
-    indiv_pts_results = sort_by_points(indiv_pts_results)
-    team_pts_results = sort_by_points(team_pts_results)
+    indiv_pts_results = sm.sort_by_points(indiv_pts_results)
+    team_pts_results = sm.sort_by_points(team_pts_results)
 
     driver_team_info = {driver:team_name_change[team] for driver, team in driver_to_team.items()}
     teams_with_drivers = get_teams_with_drivers(driver_team_info)
-    
-    global all_tricodes_to_driver
-    global all_indiv_pts_results
-    global all_team_pts_results
-    global all_team_name_changes
-    global all_teams_to_driver
-    global all_drivers_to_team
-    global all_race_locations
-    
-    all_tricodes_to_driver[year] = tricode_to_driver
-    all_indiv_pts_results[year] = indiv_pts_results
-    all_team_pts_results[year] = team_pts_results
-    all_team_name_changes[year] = team_name_change
-    all_teams_to_driver[year] = teams_with_drivers
-    all_drivers_to_team[year] = driver_team_info
-    all_race_locations[year] = race_locations
 
+    mt.record_season(year, start, time.perf_counter())
     return (tricode_to_driver, indiv_pts_results, team_pts_results, team_name_change, 
             teams_with_drivers, driver_team_info, race_locations)
 
 
-def get_all_data():
-    with ThreadPoolExecutor(max_workers=25) as executor:
-        tasks = []
-        for i in range(2000, 2025+1):
-            tasks.append(executor.submit(get_season_data, i))
-        executor.shutdown()
-    
-    global all_tricodes_to_driver
-    global all_indiv_pts_results
-    global all_team_pts_results
-    global all_team_name_changes
-    global all_teams_to_driver
-    global all_drivers_to_team
-    global all_race_locations
-
-    def sort_dict(sort_this):
-        return dict(sorted(sort_this.items()))
-
-    all_tricodes_to_driver = sort_dict(all_tricodes_to_driver)
-    all_indiv_pts_results = sort_dict(all_indiv_pts_results)
-    all_team_pts_results = sort_dict(all_team_pts_results)
-    all_team_name_changes = sort_dict(all_team_name_changes)
-    all_teams_to_driver = sort_dict(all_teams_to_driver)
-    all_drivers_to_team = sort_dict(all_drivers_to_team)
-    all_race_locations = sort_dict(all_race_locations)
-    
-    return (all_tricodes_to_driver, all_indiv_pts_results, all_team_pts_results, all_team_name_changes, 
-            all_teams_to_driver, all_drivers_to_team, all_race_locations, all_team_colors)
+def publish_season(year, season):
+    ss.publish({year: season})
+
+
+# Seasons come from the prebuilt snapshot if there is one, then finished seasons from the
+# on-disk archive, and only what's left (the live season) is scraped (by one process
+# at a time, see async_scraper.get_shared_season_data)
+def get_season_data(year):
+    import snapshot as sn
+    season = sn.get_season(year)
+    if season is None:
+        season = sa.load_season(year)
+    if season is None:
+        import async_scraper as asc
+        with mt.refresh(f"season {year}"):
+            season = asc.run_scrape_seasons([year]).get(year)
+        if season is None:
+            raise RuntimeError(f"Could not scrape the {year} season")
+    publish_season(year, season)
+    return season
+
+
+# Every season (or just the given years), from the archive where it can be and scraped otherwise
+def get_all_data(years=None):
+    years = range(FIRST_YEAR, LAST_YEAR+1) if years is None else years
+    seasons = {}
+    for year in years:
+        season = sa.load_season(year)
+        if season is not None:
+            seasons[year] = season
+
+    import async_scraper as asc
+    years_to_scrape = [year for year in years if year not in seasons]
+    if years_to_scrape:
+        with mt.refresh("all seasons"):
+            seasons.update(asc.run_scrape_seasons(years_to_scrape))
+
+    store = ss.publish(seasons)
+    return store.by_field() + (all_team_colors,)
@@ -0,0 +1,61 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import response_cache as rc
+
+BASE_URL = os.environ.get("F1_BASE_URL", "https://www.formula1.com/en/results")
+
+# Connection pool per host, shared by every scraping thread
+MAX_CONNECTIONS_PER_HOST = 25
+TIMEOUT = (5, 30)  # (connect, read) seconds
+MAX_RETRIES = 4
+BACKOFF_FACTOR = 0.5  # 0.5s, 1s, 2s, 4s between attempts
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRIES = Retry(
+    total=MAX_RETRIES,
+    backoff_factor=BACKOFF_FACTOR,
+    status_forcelist=RETRY_STATUSES,
+    allowed_methods=("GET",),
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+                    pool_block=True,  # wait for a free connection instead of opening extra ones
+                    max_retries=RETRIES,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+# Raw page bytes for a results url. Pages fetched before are revalidated, and come from the response
+# cache if they haven't changed. Any other status than 200 raises (an error or block page must never be
+# read as a page without results), except a 404 when missing_ok: races without a sprint just have no rows.
+def get(url, missing_ok=False):
+    cached = rc.lookup(url)
+    response = get_session().get(url, headers=rc.validators(cached), timeout=TIMEOUT)
+    if response.status_code == 304 and cached is not None:
+        rc.touch(url)
+        return cached.body
+    if response.status_code == 404 and missing_ok:
+        return b""
+    if response.status_code != 200:
+        raise requests.HTTPError(f"{response.status_code} {response.reason} for {url}", response=response)
+    rc.store(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), response.content)
+    return response.content
@@ -1,45 +1,46 @@
-import requests
-from bs4 import BeautifulSoup
+from collections import namedtuple
 
-# Get soup to parse through
-def get_soup(race, year):
-    link = f"https://www.formula1.com/en/results/{year}/{race}"
-    soup = BeautifulSoup(str(requests.get(link).content), "html.parser")
-    return soup
+import http_client as hc
+import metrics as mt
+import response_cache as rc
+import results_table as rt
 
-# Get final race results
+def get_url(race, year):
+    return f"{hc.BASE_URL}/{year}/{race}"
+
+# One driver's result (plain tuples pickle compactly when rows come back from parse workers)
+RaceResult = namedtuple("RaceResult", ["pos", "num", "driver", "team", "laps", "time", "pts"])
+MISSING_CELLS = [''] * len(RaceResult._fields)
+
+# Result rows from the raw bytes of a race/sprint results page
+# ( ex: RaceResult(pos="1", num="4", driver=("Lando Norris", "NOR"), team="McLaren Mercedes", ...) )
+# yielded while the page is tokenized, without collecting the table first
+def iter_race_data(content):
+    rows = rt.iter_rows(content)
+    next(rows, None)  # Ignore first element b/c it's the headers
+
+    for tr in rows:
+        row = [text_content if text_content is not None else '' for text_content, _ in tr]
+
+        # Skips empty rows and the "Note" element
+        if len(row) <= 1:
+            continue
+
+        # Splits the full name from tricode
+        row[2] = (row[2][:-3], row[2][-3:])
+        yield RaceResult._make((row + MISSING_CELLS)[:len(RaceResult._fields)])
+
+
+def parse_race_data(content):
+    return list(iter_race_data(content))
+
+
+# Same rows, without re-parsing a results page whose content hasn't changed
+cached_parse_race_data = rc.memoized(parse_race_data)
+
+
+# Get final race results (races without a sprint have no sprint page, which just means no rows)
 def get_race_data(race_link, year):
-    soup = get_soup(race_link, year)
-
-    data_rows = []
-    tr_content = soup.find_all('tr')[1:]  # Ignore first element b/c it's the headers
-    
-    # Process data
-    for tr in tr_content:
-        row_data = []
-        for td in tr.find_all('td'):
-            text_ele = td.find('p')
-            if text_ele:
-                # fixes any weird non-ASCII characters
-                text_content = text_ele.get_text(strip=True).replace('\\xc2\\xa0', ' ').encode('utf-8').decode('unicode_escape').encode('latin-1').decode('utf-8')
-                row_data.append(text_content)
-            else:
-                row_data.append('')
-
-        if row_data:
-            data_rows.append(row_data)
-    
-    # Removes the "Note" element
-    data_rows = [row for row in data_rows if len(row) != 1]
-    
-    # Splits the full name from tricode
-    data_rows = [row[:2] + [(row[2][:-3], row[2][-3:])] + row[3:] for row in data_rows]
-
-    # All data into a list of dicts
-    race_data = []
-    for row in data_rows:
-        keys = ["pos", "num", "driver", "team", "laps", "time", "pts"]
-        indiv_data = dict(zip(keys, row))
-        race_data.append(indiv_data)
-    
-    return race_data
+    kind = mt.page_kind(race_link)
+    return mt.fetch_and_parse(year, kind, get_url(race_link, year), lambda url: hc.get(url, missing_ok=kind == "sprint"),
+                              cached_parse_race_data)
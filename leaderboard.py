@@ -0,0 +1,31 @@
+from html import escape
+
+
+# "Lando Norris" -> "L. Norris"
+def short_name(driver):
+    name_split = driver.split()
+    return f"{name_split[0][0]}. {name_split[-1]}" if driver != "Zhou Guanyu" else "G. Zhou"
+
+
+# Leaderboard rows are (color, name, points), in championship order. These are the standings after a
+# round, from season_model.RoundStandings.at: the name also shows the places gained/lost since the
+# round before, and the points the gap to the leader
+def round_rows(standings, color_of, short=False):
+    rows = []
+    for name, rank, points, gap, change in standings:
+        moved = f" ▲{change}" if change > 0 else f" ▼{-change}" if change < 0 else ""
+        behind = f" (-{gap})" if gap else ""
+        rows.append((color_of(name), (short_name(name) if short else name) + moved, f"{points}{behind}"))
+    return rows
+
+
+# The whole table as one html string, so it renders as a single element
+def leaderboard_html(rows):
+    return "".join(
+        f"<div style='display: flex; align-items: center;'>"
+        f"<div style='background-color: {color}; width: 10px; height: 10px; margin-right: 5px;'></div>"
+        f"<span style='font-weight: bold;'>{position}: {escape(name)}</span>"
+        f"<span style='margin-left: auto; margin-right: -10px;'>{points}</span>"
+        f"</div>"
+        for position, (color, name, points) in enumerate(rows, start=1)
+    )
@@ -0,0 +1,143 @@
+# Timing of every page and season of a refresh: fetch latency, bytes, parse time and rows per page,
+# and assembly time per season. Each record is also logged as one json line on the "f1.metrics"
+# logger (page records at DEBUG, the refresh summary at INFO).
+import contextvars
+import inspect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("f1.metrics")
+
+_current = contextvars.ContextVar("f1_refresh", default=None)  # asyncio tasks inherit it too
+_last_lock = threading.Lock()
+_last = None
+
+
+class Refresh:
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.finished = None
+        self.pages = []
+        self.seasons = {}
+        self._lock = threading.Lock()
+
+    # Seconds since the refresh started
+    def offset(self, perf_time):
+        return perf_time - self.started
+
+    def add_page(self, page):
+        with self._lock:
+            self.pages.append(page)
+
+    def add_season(self, year, season):
+        with self._lock:
+            self.seasons[year] = season
+
+    def duration(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self):
+        return {
+            "refresh": self.name,
+            "seconds": round(self.duration(), 3),
+            "pages": len(self.pages),
+            "bytes": sum(p["bytes"] for p in self.pages),
+            "fetch_s": round(sum(p["fetch_s"] for p in self.pages), 3),
+            "parse_s": round(sum(p["parse_s"] for p in self.pages), 3),
+            "build_s": round(sum(s["build_s"] for s in self.seasons.values()), 3),
+            "seasons": len(self.seasons),
+        }
+
+    # The chain that decided when the refresh finished: the season that was built last, its
+    # calendar page, the last of its race/sprint pages to come in, then its assembly
+    def critical_path(self):
+        if not self.seasons:
+            return []
+        year, season = max(self.seasons.items(), key=lambda item: item[1]["end"])
+        year_pages = [p for p in self.pages if p["year"] == year]
+        path = [p for p in year_pages if p["kind"] == "calendar"][:1]
+        results = [p for p in year_pages if p["kind"] != "calendar"]
+        if results:
+            path.append(max(results, key=lambda p: p["end"]))
+        path.append({"year": year, "kind": "build", "url": "", "start": season["end"] - season["build_s"],
+                     "end": season["end"], "fetch_s": 0, "parse_s": season["build_s"], "bytes": 0, "rows": 0})
+        return path
+
+    def slowest_pages(self, count=15):
+        return sorted(self.pages, key=lambda p: p["fetch_s"] + p["parse_s"], reverse=True)[:count]
+
+
+# Records everything scraped inside the block as one refresh
+@contextmanager
+def refresh(name):
+    global _last
+    current = Refresh(name)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+        current.finished = time.perf_counter()
+        with _last_lock:
+            _last = current
+        logger.info(json.dumps(current.summary()))
+
+
+def last_refresh():
+    return _last
+
+
+def record_page(year, kind, url, start, fetched, parsed, size, rows):
+    current = _current.get()
+    page = {
+        "year": year, "kind": kind, "url": url,
+        "fetch_s": fetched - start, "parse_s": parsed - fetched, "bytes": size, "rows": rows,
+    }
+    if current is not None:
+        page["start"] = current.offset(start)
+        page["end"] = current.offset(parsed)
+        current.add_page(page)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps(page))
+
+
+def record_season(year, start, end):
+    current = _current.get()
+    if current is not None:
+        current.add_season(year, {"build_s": end - start, "end": current.offset(end)})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps({"year": year, "kind": "season", "build_s": end - start}))
+
+
+# Fetches url and parses it, recording both (kind is "calendar", "race" or "sprint")
+def fetch_and_parse(year, kind, url, fetch, parse):
+    start = time.perf_counter()
+    content = fetch(url)
+    fetched = time.perf_counter()
+    rows = parse(content)
+    record_page(year, kind, url, start, fetched, time.perf_counter(), len(content), len(rows))
+    return rows
+
+
+# Same for the async engine, where parse can also be a coroutine (parsing off the event loop). The
+# download holds one of limit's slots (and is timed from when it gets it), and lets go of it before
+# parsing, so pages waiting for a parse worker never keep other pages from downloading.
+async def async_fetch_and_parse(year, kind, url, fetch, parse, limit):
+    async with limit:
+        start = time.perf_counter()
+        content = await fetch(url)
+        fetched = time.perf_counter()
+    rows = parse(content)
+    if inspect.isawaitable(rows):
+        rows = await rows
+    record_page(year, kind, url, start, fetched, time.perf_counter(), len(content), len(rows))
+    return rows
+
+
+def page_kind(race_link):
+    return "sprint" if "sprint-results" in race_link else "race"
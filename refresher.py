@@ -0,0 +1,76 @@
+# Stale-while-revalidate for the seasons in the season store: once a season is loaded it keeps being
+# served as is, while a background thread rebuilds it every REFRESH_INTERVAL (or when a new snapshot is
+# dropped in) and publishes the new one when it's done. Only the first load of a season ever makes a page wait.
+import logging
+import threading
+import time
+
+import full_season_data as fs
+import season_archive as sa
+import season_store as ss
+import snapshot as sn
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = 12*3600
+CHECK_INTERVAL = 60
+
+_lock = threading.Lock()
+_loading_locks = {}
+_thread = None
+
+
+def _loading_lock(year):
+    with _lock:
+        return _loading_locks.setdefault(year, threading.Lock())
+
+
+# (version, season 7-tuple) for the year, loading it first if nobody has asked for it yet
+# (concurrent first requests for a season wait on the same load)
+def get(year):
+    store = ss.current()
+    if year not in store:
+        with _loading_lock(year):
+            store = ss.current()
+            if year not in store:
+                fs.get_season_data(year)
+                store = ss.current()
+    return store.version(year), store.season(year)
+
+
+# Seasons served from the snapshot only change with the file, and finished ones don't change at all
+def _can_change(year):
+    return not sa.is_complete(year) and sn.get_season(year) is None
+
+
+# Rebuilds every loaded season older than max_age that can still change, keeping the old one if the
+# rebuild fails. When the snapshot file is dropped in or replaced, every loaded season is rebuilt from it
+# as soon as that's seen (within CHECK_INTERVAL).
+def refresh_stale(max_age=REFRESH_INTERVAL):
+    store = ss.current()
+    if sn.has_snapshot() and sn.snapshot_changed():
+        years = store.years()
+    else:
+        now = time.time()
+        years = [year for year in store.years() if now - store.version(year) >= max_age and _can_change(year)]
+    for year in years:
+        try:
+            fs.get_season_data(year)
+        except Exception:
+            logger.exception("Refreshing the %s season failed, still serving the previous one", year)
+
+
+def _run():
+    while True:
+        time.sleep(CHECK_INTERVAL)
+        refresh_stale()
+
+
+# Starts the refresher thread (once per process)
+def start():
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name="season-refresher", daemon=True)
+            _thread.start()
+    return _thread
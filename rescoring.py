@@ -0,0 +1,77 @@
+# What-if scoring: re-scores seasons under another points system straight from their finishing
+# positions (season_model.SeasonModel), with one table lookup per season and nothing re-scraped
+import numpy as np
+
+import season_archive as sa
+import season_model as sm
+import snapshot as sn
+import team_identity as ti
+
+TOP_10 = (25, 18, 15, 12, 10, 8, 6, 4, 2, 1)
+
+# Race points by finishing place
+SYSTEMS = {
+    "2000-2002: 10-6-4-3-2-1": (10, 6, 4, 3, 2, 1),
+    "2003-2009: 10-8-6-5-4-3-2-1": (10, 8, 6, 5, 4, 3, 2, 1),
+    "2010-2025: 25-18-15-12-10-8-6-4-2-1": TOP_10,
+    "Top 5 only: 10-6-4-3-2": (10, 6, 4, 3, 2),
+}
+SPRINT_POINTS = (8, 7, 6, 5, 4, 3, 2, 1)  # 2022 onwards
+FASTEST_LAP_POINT = 1  # for a top 10 finisher
+
+# The only seasons the fastest lap can be recovered for: they awarded a point for it, so it shows
+# up as one point more than the finishing place is worth
+FASTEST_LAP_YEARS = range(2019, 2025)
+
+
+# Points by position code, to be indexed with positions.view(np.uint8) (status codes and
+# NO_RESULT get nothing)
+def lookup_table(points_by_place):
+    table = np.zeros(256, dtype=np.float32)
+    table[1:len(points_by_place)+1] = points_by_place
+    return table
+
+
+# Entries x rounds mask of who got the fastest lap point, or None if the season can't tell
+def fastest_laps(model, year):
+    if year not in FASTEST_LAP_YEARS:
+        return None
+    place_points = lookup_table(TOP_10)[model.positions.view(np.uint8)]
+    return (model.race_points - place_points == FASTEST_LAP_POINT) & (model.positions >= 1) & (model.positions <= 10)
+
+
+# Points per entry and round under a race points table, optionally with sprints and the fastest lap
+def entry_points(model, year, race_points, sprints=False, fastest_lap=False):
+    points = lookup_table(race_points)[model.positions.view(np.uint8)]
+    if sprints:
+        points += lookup_table(SPRINT_POINTS)[model.sprint_positions.view(np.uint8)]
+    if fastest_lap:
+        flags = fastest_laps(model, year)
+        if flags is not None:
+            points += flags * np.float32(FASTEST_LAP_POINT)
+    return points
+
+
+# (indiv_pts_results, team_pts_results) of a season under another system, in the same
+# {name: [cumulative, delta]} form (and order by points) as the scraped standings
+def rescore_season(model, year, race_points, sprints=False, fastest_lap=False):
+    points = entry_points(model, year, race_points, sprints, fastest_lap)
+
+    # Entrant strings are merged under their canonical team names, as in the scraped standings
+    teams = {}
+    team_of_entrant = np.array([teams.setdefault(ti.canonical_name(team), len(teams)) for team in model.teams], dtype=np.int64)
+    entry_team = team_of_entrant[model.entry_team] if len(model.entry_team) else model.entry_team
+
+    indiv_pts_results = sm.running_totals(model.drivers, sm.grouped_sum(points, model.entry_driver, len(model.drivers)))
+    team_pts_results = sm.running_totals(list(teams), sm.grouped_sum(points, entry_team, len(teams)))
+    return sm.sort_by_points(indiv_pts_results), sm.sort_by_points(team_pts_results)
+
+
+def rescore_all(models, race_points, sprints=False, fastest_lap=False):
+    return {year: rescore_season(model, year, race_points, sprints, fastest_lap) for year, model in models.items()}
+
+
+# A season's positions from the snapshot if there is one, otherwise from the archive (None if neither has them)
+def get_model(year):
+    data = sn.get_model(year) or sa.load_model(year)
+    return sm.SeasonModel.from_bytes(data) if data else None
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import season_archive as sa
+
+# Fetched pages with their ETag/Last-Modified, so refreshes can revalidate instead of re-downloading
+DB_PATH = os.path.join(sa.CACHE_DIR, "responses.sqlite3")
+MAX_BYTES = int(os.environ.get("F1_RESPONSE_CACHE_MB", 256)) * 1024 * 1024
+
+# Parsed rows of recently seen page contents, keyed by (parser, content hash)
+MAX_PARSED = 4096
+_parsed = OrderedDict()
+_parsed_lock = threading.Lock()
+
+
+class Entry:
+    __slots__ = ("etag", "last_modified", "body")
+
+    def __init__(self, etag, last_modified, body):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = body
+
+
+_conn = None
+_db_lock = threading.Lock()  # one connection per process, used by one thread at a time
+_total_bytes = 0  # size of the cached pages as of this process's last look, kept up to date by store
+
+
+# The process's connection (opened, and the table created, on first use). Callers hold _db_lock.
+def connection():
+    global _conn, _total_bytes
+    if _conn is None:
+        os.makedirs(sa.CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, "
+            "etag TEXT, "
+            "last_modified TEXT, "
+            "body BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        _total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        _conn = conn
+    return _conn
+
+
+# Closes the connection (the next call opens a new one, e.g. after the cache file was deleted)
+def close():
+    global _conn
+    with _db_lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+def lookup(url):
+    with _db_lock:
+        row = connection().execute("SELECT etag, last_modified, body FROM responses WHERE url = ?", (url,)).fetchone()
+    return Entry(*row) if row else None
+
+
+# Headers that turn a request for a cached page into a conditional one
+def validators(entry):
+    headers = {}
+    if entry is not None and entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry is not None and entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    return headers
+
+
+# Marks a cached page as just used (after a 304)
+def touch(url):
+    with _db_lock:
+        conn = connection()
+        with conn:
+            conn.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url))
+
+
+# Caches a page if the server gave us something to revalidate it with, then evicts the least
+# recently used pages until the cache fits in MAX_BYTES again. The size is tracked as pages are
+# stored, and only summed up again (which also counts other processes' pages) when it's over.
+def store(url, etag, last_modified, body):
+    global _total_bytes
+    if not etag and not last_modified:
+        return
+    with _db_lock:
+        conn = connection()
+        with conn:
+            old = conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, body, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, len(body), time.time()),
+            )
+            _total_bytes += len(body) - (old[0] if old else 0)
+            if _total_bytes <= MAX_BYTES:
+                return
+            _total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            evict = []
+            for old_url, size in conn.execute("SELECT url, size FROM responses ORDER BY last_used"):
+                if _total_bytes <= MAX_BYTES:
+                    break
+                evict.append((old_url,))
+                _total_bytes -= size
+            conn.executemany("DELETE FROM responses WHERE url = ?", evict)
+
+
+# Memo key of a parser's rows for a page's content
+def memo_key(parse, content):
+    return (parse.__module__, parse.__name__, hashlib.sha1(content).digest())
+
+
+# The parsed rows remembered for a memo key, or None
+def recall(key):
+    with _parsed_lock:
+        if key in _parsed:
+            _parsed.move_to_end(key)
+            return _parsed[key]
+    return None
+
+
+def remember(key, rows):
+    with _parsed_lock:
+        _parsed[key] = rows
+        if len(_parsed) > MAX_PARSED:
+            _parsed.popitem(last=False)
+
+
+# Drops every remembered parse (the benchmarks time parsing from scratch)
+def forget_parsed():
+    with _parsed_lock:
+        _parsed.clear()
+
+
+# Wraps a parser so a page whose content hasn't changed isn't parsed again
+# (the rows are shared between callers, so treat them as read-only)
+def memoized(parse):
+    def parse_once(content):
+        key = memo_key(parse, content)
+        rows = recall(key)
+        if rows is None:
+            rows = parse(content)
+            remember(key, rows)
+        return rows
+    return parse_once
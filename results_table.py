@@ -0,0 +1,110 @@
+import codecs
+from html.parser import HTMLParser
+
+WHITESPACE = " \t\n\r\f\v"  # ASCII only, so non-breaking spaces between name parts survive
+CHUNK_SIZE = 16 * 1024
+
+
+# Tokenizes a results page and keeps only the table cells, no DOM is built.
+# Every <tr> becomes a list of (text, href) per <td>, where text is the text of the cell's
+# first <p> (None if it has none) and href is the link of its first <a> (None if it has none)
+class ResultsTableParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._row = None
+        self._cell = None
+        self._text = None
+        self._p_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._close_row()
+            self._row = []
+        elif tag == "td" and self._row is not None:
+            self._close_cell()
+            self._cell = [None, None]
+        elif self._cell is None:
+            return
+        elif tag == "p":
+            if self._p_depth:
+                self._p_depth += 1
+            elif self._cell[0] is None:
+                self._text = []
+                self._p_depth = 1
+        elif tag == "a" and self._cell[1] is None:
+            self._cell[1] = dict(attrs).get("href")
+
+    def handle_endtag(self, tag):
+        if tag == "p" and self._p_depth:
+            self._p_depth -= 1
+            if not self._p_depth:
+                self._close_text()
+        elif tag == "td":
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+
+    def handle_data(self, data):
+        if self._p_depth:
+            self._text.append(data)
+
+    def close(self):
+        super().close()
+        self._close_row()
+
+    # same as get_text(strip=True): strip every text piece and glue them together
+    def _close_text(self):
+        if self._text is not None:
+            self._cell[0] = "".join(t.strip(WHITESPACE) for t in self._text).replace("\xa0", " ")
+        self._text = None
+        self._p_depth = 0
+
+    def _close_cell(self):
+        if self._cell is not None:
+            self._close_text()
+            self._row.append(tuple(self._cell))
+        self._cell = None
+
+    def _close_row(self):
+        if self._row is not None:
+            self._close_cell()
+            self.rows.append(self._row)
+        self._row = None
+
+
+# Every table row of a page (header rows come back as empty lists)
+def extract_rows(content):
+    return list(iter_rows(content))
+
+
+# Same rows, yielded as soon as they're tokenized. The page is decoded and fed in CHUNK_SIZE
+# pieces, so only one chunk of text and the rows not yet consumed are held at a time.
+def iter_rows(content, chunk_size=CHUNK_SIZE):
+    parser = ResultsTableParser()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    view = memoryview(content)
+    for start, end in outside_scripts(content):
+        for chunk_start in range(start, end, chunk_size):
+            parser.feed(decoder.decode(view[chunk_start:min(chunk_start+chunk_size, end)]))
+            yield from parser.rows
+            parser.rows.clear()
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    yield from parser.rows
+    parser.rows.clear()
+
+
+# (start, end) byte ranges of the page minus the bodies of its <script> tags, which can be most
+# of a page and which the tokenizer would otherwise buffer whole
+def outside_scripts(content):
+    start = 0
+    while True:
+        open_tag = content.find(b"<script", start)
+        body = content.find(b">", open_tag) if open_tag != -1 else -1
+        close_tag = content.find(b"</script", body) if body != -1 else -1
+        if close_tag == -1:
+            break
+        yield start, body + 1
+        start = close_tag
+    yield start, len(content)
@@ -0,0 +1,146 @@
+import json
+import os
+import sqlite3
+import time
+from datetime import date
+
+# Where scraped seasons are kept between restarts (override with F1_CACHE_DIR)
+CACHE_DIR = os.environ.get("F1_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".f1_cache"))
+DB_PATH = os.path.join(CACHE_DIR, "seasons.sqlite3")
+
+# Bump when the stored season layout changes so old rows get re-scraped
+# (2: every season also stores its finishing positions, see save_model;
+#  3: the live state keeps its per-round results in the saved model instead of JSON)
+FORMAT_VERSION = 3
+
+
+# A season can't change anymore once its calendar year is over
+def is_complete(year):
+    return year < date.today().year
+
+
+def connect():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS seasons ("
+        "year INTEGER PRIMARY KEY, "
+        "version INTEGER NOT NULL, "
+        "complete INTEGER NOT NULL, "
+        "updated_at REAL NOT NULL, "
+        "data TEXT NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS models ("
+        "year INTEGER PRIMARY KEY, "
+        "version INTEGER NOT NULL, "
+        "updated_at REAL NOT NULL, "
+        "data BLOB NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS live_state ("
+        "year INTEGER PRIMARY KEY, "
+        "version INTEGER NOT NULL, "
+        "updated_at REAL NOT NULL, "
+        "data TEXT NOT NULL)"
+    )
+    return conn
+
+
+# Returns the stored season tuple, or None if it has to be scraped
+# (live seasons are only served from disk when include_live is set, or if they were saved after saved_since)
+def load_season(year, include_live=False, saved_since=None):
+    conn = connect()
+    try:
+        row = conn.execute(
+            "SELECT complete, updated_at, data FROM seasons WHERE year = ? AND version = ?",
+            (year, FORMAT_VERSION),
+        ).fetchone()
+    finally:
+        conn.close()
+
+    if row is None:
+        return None
+    complete, updated_at, data = row
+    if not complete and not include_live and (saved_since is None or updated_at < saved_since):
+        return None
+    return tuple(json.loads(data))
+
+
+# Saves a season tuple, marking it immutable if the season is already over
+# (a finished season without races or results is refused, it would be served like that for good)
+def save_season(year, season):
+    if is_complete(year) and not (season[1] and season[6]):
+        raise ValueError(f"Not saving the finished {year} season, it has no races or results")
+    conn = connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO seasons (year, version, complete, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+                (year, FORMAT_VERSION, int(is_complete(year)), time.time(), json.dumps(season)),
+            )
+    finally:
+        conn.close()
+
+
+
+# Where ingesting the live season got to (its results are in its saved model), so a refresh
+# only fetches the new rounds (and the last one again, see full_season_data.REFETCH_ROUNDS)
+def load_live_state(year):
+    conn = connect()
+    try:
+        row = conn.execute(
+            "SELECT data FROM live_state WHERE year = ? AND version = ?",
+            (year, FORMAT_VERSION),
+        ).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else None
+
+
+def save_live_state(year, state):
+    conn = connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO live_state (year, version, updated_at, data) VALUES (?, ?, ?, ?)",
+                (year, FORMAT_VERSION, time.time(), json.dumps(state)),
+            )
+    finally:
+        conn.close()
+
+
+def delete_live_state(year):
+    conn = connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM live_state WHERE year = ?", (year,))
+    finally:
+        conn.close()
+
+
+# Finishing positions and points of every entry, as season_model.SeasonModel.to_bytes
+# (kept for live seasons too, they're rewritten on every refresh)
+def load_model(year):
+    conn = connect()
+    try:
+        row = conn.execute(
+            "SELECT data FROM models WHERE year = ? AND version = ?",
+            (year, FORMAT_VERSION),
+        ).fetchone()
+    finally:
+        conn.close()
+    return bytes(row[0]) if row else None
+
+
+def save_model(year, data):
+    conn = connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO models (year, version, updated_at, data) VALUES (?, ?, ?, ?)",
+                (year, FORMAT_VERSION, time.time(), data),
+            )
+    finally:
+        conn.close()
@@ -0,0 +1,206 @@
+import io
+import json
+
+import numpy as np
+
+NO_RESULT = 0
+
+# Finishing "positions" that aren't a classified place
+STATUS_CODES = {"NC": -1, "DQ": -2, "DNS": -3, "EX": -4, "DNQ": -5, "DNPQ": -6}
+OTHER_STATUS = -7
+
+
+POSITION_CODES = {**{str(pos): pos for pos in range(1, 100)}, **STATUS_CODES}
+
+
+# Columnar view of a season: one row per driver-team entry, one column per race.
+# entry_driver/entry_team index into drivers/teams, points holds race + sprint points per round
+# and race_points just the race's. Ingest builds it directly, one add_results per results page.
+class SeasonModel:
+    __slots__ = ("drivers", "teams", "entry_driver", "entry_team", "points", "race_points", "positions", "sprint_positions",
+                 "_ids", "_buffers")
+    ARRAYS = ("entry_driver", "entry_team", "points", "race_points", "positions", "sprint_positions")
+    MATRICES = ("points", "race_points", "positions", "sprint_positions")
+
+    def __init__(self, drivers, teams, entry_driver, entry_team, points, race_points, positions, sprint_positions):
+        self.drivers = drivers
+        self.teams = teams
+        self.entry_driver = entry_driver
+        self.entry_team = entry_team
+        self.points = points
+        self.race_points = race_points
+        self.positions = positions
+        self.sprint_positions = sprint_positions
+        self._ids = None  # driver, team and entry lookups by name, built on the first add_results
+        self._buffers = None
+
+    # An empty season of num_races rounds, filled in with add_results as pages are ingested
+    @classmethod
+    def empty(cls, num_races):
+        return cls(
+            [], [], np.zeros(0, dtype=np.int16), np.zeros(0, dtype=np.int16),
+            np.zeros((0, num_races), dtype=np.float32), np.zeros((0, num_races), dtype=np.float32),
+            np.zeros((0, num_races), dtype=np.int8), np.zeros((0, num_races), dtype=np.int8),
+        )
+
+    def num_races(self):
+        return self.points.shape[1]
+
+    # Adds columns for the rounds that joined the calendar since the season was last ingested
+    def extend_rounds(self, num_races):
+        extra = num_races - self.num_races()
+        if extra <= 0:
+            return
+        for name in self.MATRICES:
+            setattr(self, name, np.pad(getattr(self, name), ((0, 0), (0, extra))))
+        self._buffers = None
+
+    # Forgets a round's results, so a page that's ingested again (amended results) replaces them
+    def clear_round(self, race_num):
+        for name in self.MATRICES:
+            getattr(self, name)[:, race_num] = NO_RESULT
+
+    # Row of a driver-team entry, added the first time the pair shows up
+    def entry(self, driver, team):
+        if self._ids is None:
+            self._ids = (
+                {name: i for i, name in enumerate(self.drivers)},
+                {name: i for i, name in enumerate(self.teams)},
+                {(self.drivers[d], self.teams[t]): i for i, (d, t) in enumerate(zip(self.entry_driver.tolist(), self.entry_team.tolist()))},
+            )
+        driver_ids, team_ids, entry_rows = self._ids
+        row = entry_rows.get((driver, team))
+        if row is not None:
+            return row
+
+        driver_id = driver_ids.get(driver)
+        if driver_id is None:
+            driver_id = driver_ids[driver] = len(self.drivers)
+            self.drivers.append(driver)
+        team_id = team_ids.get(team)
+        if team_id is None:
+            team_id = team_ids[team] = len(self.teams)
+            self.teams.append(team)
+
+        row = entry_rows[driver, team] = len(self.entry_driver)
+        self._add_row()
+        self.entry_driver[row] = driver_id
+        self.entry_team[row] = team_id
+        return row
+
+    # Arrays are views into buffers with spare rows, so a new entry only reallocates when they're full
+    def _add_row(self):
+        rows = len(self.entry_driver) + 1
+        if self._buffers is None or rows > len(self._buffers["entry_driver"]):
+            capacity = max(2*rows, 32)
+            self._buffers = {}
+            for name in self.ARRAYS:
+                array = getattr(self, name)
+                buffer = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+                buffer[:len(array)] = array
+                self._buffers[name] = buffer
+        for name in self.ARRAYS:
+            setattr(self, name, self._buffers[name][:rows])
+
+    # Records a results page: (driver, team) entries with their position and points strings, which
+    # are parsed here once, in one go per page. Writing the same page twice leaves the season as it was.
+    def add_results(self, race_num, entries, positions, points, sprint=False):
+        rows = np.array([self.entry(driver, team) for driver, team in entries], dtype=np.intp)
+        codes = np.array([POSITION_CODES.get(pos, OTHER_STATUS) for pos in positions], dtype=np.int8)
+        points = np.array(points, dtype=np.float32)
+        if sprint:
+            self.sprint_positions[rows, race_num] = codes
+            self.points[rows, race_num] = self.race_points[rows, race_num] + points
+        else:
+            self.positions[rows, race_num] = codes
+            self.points[rows, race_num] += points - self.race_points[rows, race_num]
+            self.race_points[rows, race_num] = points
+
+    # Compact binary form for the archive and the snapshot (an .npz, names included)
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        names = np.frombuffer(json.dumps([self.drivers, self.teams]).encode(), dtype=np.uint8)
+        np.savez_compressed(buffer, names=names, **{name: getattr(self, name) for name in self.ARRAYS})
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            drivers, teams = json.loads(arrays["names"].tobytes())
+            return cls(drivers, teams, *(arrays[name] for name in cls.ARRAYS))
+
+    def driver_points(self):
+        return grouped_sum(self.points, self.entry_driver, len(self.drivers))
+
+    def team_points(self):
+        return grouped_sum(self.points, self.entry_team, len(self.teams))
+
+
+# Sums the rows of matrix that share a group id (as a one-hot matrix product, much faster than np.add.at)
+def grouped_sum(matrix, groups, num_groups):
+    one_hot = np.zeros((num_groups, len(groups)), dtype=np.float64)
+    one_hot[groups, np.arange(len(groups))] = 1
+    return one_hot @ matrix
+
+
+# Whole numbers as ints, so 25.0 shows up as 25 but 0.5 stays 0.5 (one list per matrix row)
+def as_numbers(matrix):
+    whole = matrix == np.floor(matrix)
+    if whole.all():
+        return matrix.astype(np.int64).tolist()
+    return [
+        [int(n) if is_whole else n for n, is_whole in zip(row, row_whole)]
+        for row, row_whole in zip(matrix.tolist(), whole.tolist())
+    ]
+
+
+# {name: [cumulative, delta]} for every row of race_pts
+def running_totals(names, race_pts):
+    cumulative = as_numbers(np.cumsum(race_pts, axis=1))
+    delta = as_numbers(race_pts)
+    return {name: [cumulative[i], delta[i]] for i, name in enumerate(names)}
+
+
+# Keys of results ({name: [cumulative, delta]}) ordered by end-of-season points, most first
+def sort_by_points(results):
+    names = list(results)
+    totals = np.array([v[0][-1] if v[0] else 0 for v in results.values()], dtype=np.float64)
+    return {names[i]: results[names[i]] for i in np.argsort(-totals, kind="stable")}
+
+
+# Standings after every round, for {name: [cumulative, delta]} results: per round, the order of the
+# names, their rank, points behind the leader and places gained since the round before.
+# Everything is worked out in one go with a stable argsort down each round's column, so ties keep
+# the results' order (same as sort_by_points after the last round).
+class RoundStandings:
+    __slots__ = ("names", "points", "order", "ranks", "gaps", "changes")
+
+    def __init__(self, results):
+        self.names = list(results)
+        num_rounds = max((len(v[0]) for v in results.values()), default=0)
+        self.points = np.zeros((len(self.names), num_rounds), dtype=np.float64)
+        for i, (cumulative, delta) in enumerate(results.values()):
+            self.points[i, :len(cumulative)] = cumulative
+
+        self.order = np.argsort(-self.points, axis=0, kind="stable")
+        self.ranks = np.empty_like(self.order)
+        place = np.broadcast_to(np.arange(1, len(self.names)+1)[:, None], self.order.shape)
+        np.put_along_axis(self.ranks, self.order, place, axis=0)
+        self.gaps = self.points.max(axis=0, initial=0) - self.points
+        self.changes = np.zeros_like(self.ranks)
+        self.changes[:, 1:] = self.ranks[:, :-1] - self.ranks[:, 1:]
+
+    def num_rounds(self):
+        return self.points.shape[1]
+
+    # [(name, rank, points, gap to the leader, places gained), ...] in standings order after a round
+    # (round_index counts from 0)
+    def at(self, round_index):
+        order = self.order[:, round_index]
+        points = as_numbers(self.points[order, round_index][None, :])[0]
+        gaps = as_numbers(self.gaps[order, round_index][None, :])[0]
+        return [
+            (self.names[i], rank, pts, gap, change)
+            for i, rank, pts, gap, change
+            in zip(order.tolist(), range(1, len(order)+1), points, gaps, self.changes[order, round_index].tolist())
+        ]
@@ -0,0 +1,73 @@
+# Every season loaded in this process. A store never changes once built: a refresh gathers its
+# seasons privately and publishes them as a new store, which shares the season tuples of the
+# old one instead of copying them. Readers just take current() and never need a lock.
+import threading
+import time
+from types import MappingProxyType
+
+# Positions in the 8-tuple returned by full_season_data.get_all_data, and in a season's 7-tuple
+FIELDS = ("tricodes_to_driver", "indiv_pts_results", "team_pts_results", "team_name_changes",
+          "teams_to_driver", "drivers_to_team", "race_locations")
+
+
+class SeasonStore:
+    __slots__ = ("_seasons", "_versions", "_careers")
+
+    def __init__(self, seasons=None, versions=None):
+        self._seasons = MappingProxyType(dict(sorted((seasons or {}).items())))
+        self._versions = MappingProxyType(dict(versions or {}))
+        self._careers = None
+
+    def __contains__(self, year):
+        return year in self._seasons
+
+    def __len__(self):
+        return len(self._seasons)
+
+    def years(self):
+        return list(self._seasons)
+
+    # The season's 7-tuple, or None if it isn't loaded
+    def season(self, year):
+        return self._seasons.get(year)
+
+    # When the season was published (changes every time it's replaced)
+    def version(self, year):
+        return self._versions.get(year)
+
+    # Career index over the store's seasons, built the first time it's asked for
+    # (a racing second build just produces an identical index)
+    def careers(self):
+        if self._careers is None:
+            import career_index as ci
+            self._careers = ci.build(self)
+        return self._careers
+
+    # A new store with the given seasons added or replaced
+    def with_seasons(self, seasons):
+        now = time.time()
+        return SeasonStore(
+            {**self._seasons, **seasons},
+            {**self._versions, **{year: now for year in seasons}},
+        )
+
+    # One {year: value} dict per season field, ordered by year
+    def by_field(self):
+        return tuple({year: season[i] for year, season in self._seasons.items()} for i in range(len(FIELDS)))
+
+
+_current = SeasonStore()
+_publish_lock = threading.Lock()
+
+
+def current():
+    return _current
+
+
+# Swaps in a store with the given {year: season} merged over the current one and returns it
+# (concurrent publishers are serialized, so neither loses the other's seasons)
+def publish(seasons):
+    global _current
+    with _publish_lock:
+        _current = _current.with_seasons(seasons)
+        return _current
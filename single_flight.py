@@ -0,0 +1,63 @@
+# Cross-process single flight for scraping seasons. Every process sharing the cache directory (dashboard
+# replicas, session threads, the data service) takes a season's lock file before scraping it, so only one
+# of them scrapes a season at a time. The others wait for the lock and then read what it saved to the archive.
+# The locks are flock()s: the OS drops them if their holder dies, so a crash never leaves a season locked.
+import asyncio
+import contextlib
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): every process just scrapes for itself
+    fcntl = None
+
+import season_archive as sa
+
+logger = logging.getLogger(__name__)
+
+LOCK_DIR = os.path.join(sa.CACHE_DIR, "locks")
+POLL_INTERVAL = 0.1
+WAIT_TIMEOUT = 600  # seconds a season waits for another process's scrape of it, before scraping it anyway
+SHARED_WINDOW = 60  # seasons saved this recently by someone else are used instead of being scraped again
+
+
+# The season's lock file, locked, or None if another process holds it
+def try_lock(year):
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    f = open(os.path.join(LOCK_DIR, f"season-{year}.lock"), "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f
+
+
+# Holds the season's lock, waiting on the event loop (without blocking it) while someone else has it.
+# After WAIT_TIMEOUT (counted from when the season asks for it) it goes ahead without the lock.
+@contextlib.asynccontextmanager
+async def season_lock(year):
+    if fcntl is None:
+        yield
+        return
+    until = time.monotonic() + WAIT_TIMEOUT
+    f = try_lock(year)
+    while f is None:
+        if time.monotonic() > until:
+            logger.warning("Gave up waiting for another process to scrape the %s season", year)
+            yield
+            return
+        await asyncio.sleep(POLL_INTERVAL)
+        f = try_lock(year)
+    try:
+        yield
+    finally:
+        f.close()  # closing the file drops its lock
+
+
+# The season from the archive if it's there for good, or if someone saved it within SHARED_WINDOW of since
+# (i.e. while this process was waiting for its lock, or just before), otherwise None
+def load_saved(year, since):
+    return sa.load_season(year, saved_since=since - SHARED_WINDOW)
@@ -0,0 +1,121 @@
+# Prebuilt snapshot of every season, so the app can boot without scraping.
+#
+#   python snapshot.py build [PATH]   # run the full pipeline once and write the snapshot (the refresh job)
+#   python snapshot.py info [PATH]
+#
+# The file is a small header (magic, format version, build time, payload size) followed by the
+# zlib-compressed pickle of the 8-tuple returned by full_season_data.get_all_data, plus (since version 2)
+# a {year: SeasonModel.to_bytes()} dict with every season's finishing positions.
+# It is only ever written by the build command above, so it is trusted like the code itself.
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import season_archive as sa
+
+MAGIC = b"F1SNAP"
+SNAPSHOT_VERSION = 2
+READABLE_VERSIONS = (1, 2)  # version 1 snapshots just have no models
+HEADER = struct.Struct("<6sHdQ")  # magic, version, built at, payload bytes
+SNAPSHOT_PATH = os.environ.get("F1_SNAPSHOT", os.path.join(sa.CACHE_DIR, "snapshot.bin"))
+
+_loaded = (None, None)  # (file mtime, data) of the last snapshot read
+_loaded_lock = threading.Lock()
+
+
+def write_snapshot(data, path=SNAPSHOT_PATH):
+    payload = zlib.compress(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), 6)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # Written next to the old one and swapped in, so readers never see half a file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, SNAPSHOT_VERSION, time.time(), len(payload)))
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+# Returns (built at, data)
+def read_snapshot(path=SNAPSHOT_PATH):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, version, built_at, size = HEADER.unpack_from(mm)
+        if magic != MAGIC or version not in READABLE_VERSIONS:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} snapshot")
+        payload = zlib.decompress(memoryview(mm)[HEADER.size:HEADER.size + size])
+    return built_at, pickle.loads(payload)
+
+
+# The current snapshot's data, or None if there isn't one (re-read whenever the file is replaced)
+def load_snapshot(path=SNAPSHOT_PATH):
+    global _loaded
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+
+    with _loaded_lock:
+        if _loaded[0] != mtime:
+            _loaded = (mtime, read_snapshot(path)[1])
+        return _loaded[1]
+
+
+def has_snapshot(path=SNAPSHOT_PATH):
+    return os.path.exists(path)
+
+
+# True if the file at path isn't the one load_snapshot last read (it was dropped in, replaced or removed)
+def snapshot_changed(path=SNAPSHOT_PATH):
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        mtime = None
+    with _loaded_lock:
+        return _loaded[0] != mtime
+
+
+# One season's 7-tuple (same as full_season_data.get_season_data), or None if the snapshot doesn't have it
+def get_season(year, path=SNAPSHOT_PATH):
+    data = load_snapshot(path)
+    if data is None or year not in data[1]:
+        return None
+    return tuple(all_results[year] for all_results in data[:7])
+
+
+# A season's SeasonModel.to_bytes(), or None if the snapshot doesn't have it
+def get_model(year, path=SNAPSHOT_PATH):
+    data = load_snapshot(path)
+    if data is None or len(data) < 9:
+        return None
+    return data[8].get(year)
+
+
+def build(path=SNAPSHOT_PATH):
+    import full_season_data as fs
+    start = time.time()
+    data = fs.get_all_data()
+    models = {year: sa.load_model(year) for year in data[1]}
+    data += ({year: model for year, model in models.items() if model is not None},)
+    write_snapshot(data, path)
+    print(f"Wrote {len(data[1])} seasons to {path} ({os.path.getsize(path)/1024:.0f} KiB) in {time.time() - start:.1f}s")
+
+
+def info(path=SNAPSHOT_PATH):
+    start = time.perf_counter()
+    built_at, data = read_snapshot(path)
+    load_ms = (time.perf_counter() - start) * 1000
+    years = sorted(data[1])
+    models = len(data[8]) if len(data) > 8 else 0
+    print(f"{path}: built {time.ctime(built_at)}, seasons {years[0]}-{years[-1]} ({models} with positions), "
+          f"{os.path.getsize(path)/1024:.0f} KiB, loads in {load_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("build", "info"):
+        sys.exit("usage: python snapshot.py build|info [PATH]")
+    command = build if sys.argv[1] == "build" else info
+    command(*sys.argv[2:3])
@@ -1,16 +1,95 @@
+import threading
+
 # Streamlit modules to import
 import streamlit as st
 from streamlit_echarts import st_echarts
 
 
-# Gathers Data from APIs every 12 hours (or when the app is initally started)
-@st.cache_data(ttl=12*3600)
-def get_data():
+# Where seasons come from: the shared data service when F1_DATA_SERVICE is set (see data_service.py),
+# otherwise this process loads and refreshes its own
+def season_source():
+    import data_service as ds
+    if ds.SERVICE_URL:
+        return ds
+    import refresher as rf
+    return rf
+
+
+# Gathers a single season when it is first selected (from the prebuilt snapshot if there is one,
+# otherwise finished seasons come from the on-disk archive and only the live one is scraped).
+# After that the refresher rebuilds it in the background and this returns the last good copy.
+def get_season(year):
+    import full_season_data as fs
+    version, season = season_source().get(year)
+    return version, season + (fs.all_team_colors.get(year),)
+
+
+# Fills in the seasons nobody has picked yet in the background, once per server process
+# (not needed when booting from a prebuilt snapshot, see snapshot.py, or when the data service does it)
+@st.cache_resource
+def start_background_loading():
+    import data_service as ds
     import full_season_data as fs
-    all_data = fs.get_all_data()
-    return all_data
-data = get_data()
-all_tricodes_to_driver, all_indiv_pts_results, all_team_pts_results, all_team_name_changes, all_teams_to_driver, all_drivers_to_team, all_race_locations, all_team_colors = data
+    import refresher as rf
+    import snapshot as sn
+    if ds.SERVICE_URL:
+        return None
+    rf.start()
+    if sn.has_snapshot():
+        return None
+    thread = threading.Thread(target=fs.get_all_data, name="season-prefetch", daemon=True)
+    thread.start()
+    return thread
+start_background_loading()
+
+
+# {name: [cumulative, delta]} standings of a championship, as scraped or re-scored under another
+# points system (scoring is None or (system, sprints, fastest lap), see rescoring.py).
+# None if the season's finishing positions aren't available to re-score it.
+@st.cache_resource(max_entries=256)
+def get_results(year, championship, version, scoring=None):
+    import data_service as ds
+    import rescoring as rs
+    season = get_season(year)[1]
+    if scoring is None:
+        return season[1] if championship == "Drivers" else season[2]
+    model = ds.get_model(year) if ds.SERVICE_URL else rs.get_model(year)
+    if model is None:
+        return None
+    system, sprints, fastest_lap = scoring
+    indiv_pts_results, team_pts_results = rs.rescore_season(model, year, rs.SYSTEMS[system], sprints, fastest_lap)
+    return indiv_pts_results if championship == "Drivers" else team_pts_results
+
+
+# Chart options are only built once per season, championship, scoring and version of the season's data
+@st.cache_data(max_entries=128)
+def get_chart_option(year, championship, version, scoring=None):
+    import chart_options as co
+    (tricode_to_driver, indiv_pts_results, team_pts_results, team_name_change,
+     teams_with_drivers, driver_team_info, race_locations, team_colors) = get_season(year)[1]
+    results = get_results(year, championship, version, scoring)
+    if championship == "Drivers":
+        return co.drivers_option(year, results, driver_team_info, race_locations, team_colors)
+    return co.constructors_option(year, results, race_locations, team_colors)
+
+
+# Per-round ranks, gaps and position changes, worked out once per season, championship, scoring and version
+@st.cache_resource(max_entries=128)
+def get_round_standings(year, championship, version, scoring=None):
+    import season_model as sm
+    return sm.RoundStandings(get_results(year, championship, version, scoring))
+
+
+# Leaderboard html after a round, also built once per season, championship, version, round and scoring
+@st.cache_data(max_entries=1024)
+def get_leaderboard(year, championship, version, round_index, scoring=None):
+    import leaderboard as lb
+    (tricode_to_driver, indiv_pts_results, team_pts_results, team_name_change,
+     teams_with_drivers, driver_team_info, race_locations, team_colors) = get_season(year)[1]
+    standings = get_round_standings(year, championship, version, scoring).at(round_index)
+    if championship == "Drivers":
+        return lb.leaderboard_html(lb.round_rows(standings, lambda driver: team_colors[driver_team_info[driver]], short=True))
+    return lb.leaderboard_html(lb.round_rows(standings, lambda team: team_colors[team]))
 
 
 # Function to display title page
@@ -46,9 +125,101 @@ def title_page():
     with col2:
         st.image("https://i.postimg.cc/3RQzm9yg/Screenshot-2024-09-01-at-13-00-13.png", caption="Dashboard Preview")
 
+
+# Hidden page (?page=diagnostics) with the timings of the last refresh in this process
+def diagnostics_page():
+    import metrics as mt
+    st.title("Diagnostics")
+
+    last = mt.last_refresh()
+    if last is None:
+        st.info("No refresh has finished in this process yet.")
+        return
+
+    summary = last.summary()
+    st.write(f"Last refresh: **{summary['refresh']}**, {summary['pages']} pages ({summary['bytes']/1024:.0f} KiB) "
+             f"for {summary['seasons']} seasons")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Wall time", f"{summary['seconds']:.1f}s")
+    col2.metric("Fetching (summed)", f"{summary['fetch_s']:.1f}s")
+    col3.metric("Parsing (summed)", f"{summary['parse_s']:.1f}s")
+    col4.metric("Assembly (summed)", f"{summary['build_s']:.2f}s")
+
+    def page_rows(pages):
+        return [
+            {
+                "year": p["year"], "kind": p["kind"], "url": p["url"],
+                "start ms": round(p.get("start", 0) * 1000), "end ms": round(p.get("end", 0) * 1000),
+                "fetch ms": round(p["fetch_s"] * 1000, 1), "parse ms": round(p["parse_s"] * 1000, 1),
+                "KiB": round(p["bytes"] / 1024, 1), "rows": p["rows"],
+            }
+            for p in pages
+        ]
+
+    st.subheader("Critical path")
+    st.dataframe(page_rows(last.critical_path()), hide_index=True)
+    st.subheader("Slowest pages")
+    st.dataframe(page_rows(last.slowest_pages()), hide_index=True)
+
+if st.query_params.get("page") == "diagnostics":
+    diagnostics_page()
+    st.stop()
+
+# Every season, once the background load is done (whatever it couldn't get is loaded here,
+# seasons that still fail are left out)
+def get_all_seasons():
+    import full_season_data as fs
+    import season_store as ss
+    thread = start_background_loading()
+    if thread is not None:
+        thread.join()
+    for year in range(fs.FIRST_YEAR, fs.LAST_YEAR+1):
+        try:
+            season_source().get(year)
+        except RuntimeError:
+            continue
+    return ss.current()
+
+
+# Multi-season career chart for drivers or constructor lineages
+def career_page():
+    import career_index as ci
+    import chart_options as co
+    import team_colors as tc
+    import team_identity as ti
+    st.title("F1 Careers")
+    with st.spinner("Loading every season..."):
+        careers = get_all_seasons().careers()
+
+    kind = st.radio("Careers of:", ["Drivers", "Constructors"], horizontal=True)
+    index = careers.drivers if kind == "Drivers" else careers.constructors
+    by_career_points = sorted(index, key=lambda name: ci.career_totals(index[name])[-1][2], reverse=True)
+    def label(name):
+        chain = ti.lineage_chain(name) if kind == "Constructors" else (name,)
+        return " → ".join(chain) if len(chain) > 1 else name
+    names = st.multiselect(f"Select {kind.lower()}:", by_career_points, default=by_career_points[:5], format_func=label)
+    if kind == "Drivers":
+        tricode = st.text_input("Add drivers by tricode (e.g. ALO):").strip().upper()
+        names += [name for name in careers.drivers_with_tricode(tricode) if name not in names]
+    if not names:
+        st.info(f"Select at least one of the {kind.lower()}.")
+        return
+
+    selected = {name: index[name] for name in names}
+    colors = {name: tc.all_team_colors.get(seasons[-1].year, {}).get(seasons[-1].team, "#888888")
+              for name, seasons in selected.items()}
+    st_echarts(options=co.career_option(f"{kind} careers", selected, colors), height="565px", width="115%")
+
+
 # Sidebar title
 st.sidebar.title("F1 Standings")
 
+# Season standings or careers across every season
+view = st.sidebar.radio("View:", ["Season standings", "Careers"])
+if view == "Careers":
+    career_page()
+    st.stop()
+
 # Year selection in sidebar
 year_option = st.sidebar.selectbox(
     "Select year:",
@@ -64,181 +235,74 @@ selection = st.sidebar.radio(
     disabled=(year_option is None)  # Disable if no year is selected
 )
 
+# What-if: the season re-scored under another points system (from the finishing positions, no re-scraping)
+def points_systems():
+    import rescoring as rs
+    return ["As scored", *rs.SYSTEMS]
+
+points_system = st.sidebar.selectbox(
+    "Points system:",
+    points_systems(),
+    disabled=(year_option is None)
+)
+scoring = None
+if points_system != "As scored":
+    scoring = (
+        points_system,
+        st.sidebar.checkbox("Count sprints (8-7-6-5-4-3-2-1)", value=True),
+        st.sidebar.checkbox("Point for the fastest lap (2019-2024 only)", value=False),
+    )
+
 # Display title page when no year is selected
 if year_option is None:
     title_page()
 
-# Function to display Constructors Standings
-def constructors_standings():
-    st.title("F1 Constructors Standings")
-
-    global year_option; global all_team_pts_results; global all_race_locations; global all_team_colors
+# Chart with the leaderboard next to it, shared by both championship pages
+def standings_page(championship, chart_height):
+    global year_option
     year_option = int(year_option)
-    
-    f1_data = {
-        "teamsWithPoints": all_team_pts_results.get(year_option),
-        "raceLocations": all_race_locations.get(year_option)
-    }
-
-    # Create datasets for each team
-    datasets = [
-        {
-            "id": f"dataset_{team}",
-            "source": [[i, points, f1_data["raceLocations"][i], f"(+{change})"] for i, points, change in zip(range(len(points_list[0])), points_list[0], points_list[1])]
-        }
-        for team, points_list in f1_data["teamsWithPoints"].items()
-    ]
-
-    # Create series configuration for each team
-    series_list = [
-        {
-            "type": "line",
-            "datasetId": f"dataset_{team}",
-            "showSymbol": True,
-            "name": team,
-            "endLabel": {
-                "show": True,
-                "formatter": "{@[1]}" + f" - {team}",
-                "fontSize": 12,
-                "textBorderColor": all_team_colors.get(year_option)[team],  # Team-dependent color
-                "textBorderWidth": 2,
-                "color": "black",
-            },
-            "labelLayout": {"moveOverlap": "shiftY"},
-            "emphasis": {"focus": "series"},
-            "encode": {
-                "x": 0,
-                "y": 1,
-                "tooltip": [1, 3]
-            },
-            "itemStyle": {
-                "color": all_team_colors.get(year_option)[team]  # Team-dependent color
-            }
-        }
-        for team in f1_data["teamsWithPoints"].keys()
-    ]
-
-    # Configure the chart options
-    option = {
-        "animationDuration": 500,
-        "dataset": datasets,  # Using the datasets created above
-        "title": {"text": f"Year: {year_option}"},
-        "tooltip": {
-            "trigger": "axis",
-        },
-        "xAxis": {
-            "type": "category",
-            "nameLocation": "middle",
-            "axisLabel": {
-                "rotate": 45,  # Rotating race location labels 45 degrees
-                "formatter": "{value}",
-                "fontSize": 11,
-                "fontWeight": "bold"
-            },
-            "data": f1_data["raceLocations"]
-        },
-        "yAxis": {"name": "Points"},
-        "grid": {"right": 100},
-        "series": series_list,
-    }
-    
-    # Displaying the chart
-    st_echarts(options=option, height="550px")
-
+    global scoring
+    with st.spinner(f"Loading the {year_option} season..."):
+        version, season = get_season(year_option)
+        if scoring is not None and get_results(year_option, championship, version, scoring) is None:
+            st.warning(f"The finishing positions of the {year_option} season aren't available, showing it as scored.")
+            scoring = None
+        option = get_chart_option(year_option, championship, version, scoring)
+    race_locations = season[6]
 
-# Function to display Drivers Standings
-def driver_standings():
-    st.title("F1 Drivers Standings")
-
-    global year_option; global all_indiv_pts_results; global all_race_locations
-    global all_team_colors; global all_drivers_to_team
-    year_option = int(year_option)
-
-    f1_data = {
-        "driverData": all_indiv_pts_results.get(year_option),
-        "raceLocations": all_race_locations.get(year_option)
-    }
-
-    # Create datasets for each team
-    datasets = [
-        {
-            "id": f"dataset_{driver}",
-            "source": [[i, points, f1_data["raceLocations"][i], f"(+{change})"] for i, points, change in zip(range(len(points_list[0])), points_list[0], points_list[1])]
-        }
-        for driver, points_list in f1_data["driverData"].items()
-    ]
-
-    # Create series configuration for each team
-    series_list = [
-        {
-            "type": "line",
-            "datasetId": f"dataset_{driver}",
-            "showSymbol": True,
-            "name": driver,
-            "endLabel": {
-                "show": False,
-                "formatter": "{@[1]}" + f" - {driver}",
-            },
-            "labelLayout": {"moveOverlap": "shiftY"},
-            "emphasis": {"focus": "series"},
-            "encode": {
-                "x": 0,
-                "y": 1,
-                "tooltip": [1, 3]
-            },
-            "itemStyle": {
-                "color": all_team_colors.get(year_option)[all_drivers_to_team.get(year_option)[driver]]
-            }
-        }
-        for driver in f1_data["driverData"].keys()
-    ]
-
-    # Configure the chart options
-    option = {
-        "animationDuration": 500,
-        "dataset": datasets,
-        "title": {"text": f"Year: {year_option}"},
-        "tooltip": {
-            "show": True,
-            "trigger": "item",
-        },
-        "xAxis": {
-            "type": "category",
-            "nameLocation": "middle",
-            "axisLabel": {
-                "rotate": 45,  # Rotate race location labels 45 degrees
-                "formatter": "{value}",
-                "fontSize": 10,
-                "fontWeight": "bold"
-            },
-            "data": f1_data["raceLocations"]
-        },
-        "yAxis": {"name": "Points"},
-        "grid": {"right": 100},
-        "series": series_list,
-    }
+    # Standings after any round, the last one by default
+    round_index = len(race_locations) - 1
+    if len(race_locations) > 1:
+        round_index = st.select_slider(
+            "Standings after:",
+            options=range(len(race_locations)),
+            value=round_index,
+            format_func=lambda i: f"Round {i+1}: {race_locations[i]}",
+        )
+    leaderboard = get_leaderboard(year_option, championship, version, max(round_index, 0), scoring) if race_locations else ""
 
     # Create two columns: one for the chart, one for the leaderboard
     col1, col2 = st.columns([3, 1])
     
     # Rendering the chart
     with col1:
-        st_echarts(options=option, height="565px", width="115%")
+        st_echarts(options=option, height=chart_height, width="115%")
     
-    # Display the leaderboard
+    # Display the leaderboard (in a single element)
     with col2:   
-        for position, (driver, points) in zip(range(1, len(f1_data['driverData'])+1), f1_data['driverData'].items()):
-            team_color = all_team_colors.get(year_option)[all_drivers_to_team.get(year_option)[driver]]
-            name_split = driver.split()
-            name = f"{name_split[0][0]}. {name_split[-1]}" if driver != "Zhou Guanyu" else "G. Zhou"
-            st.markdown(
-                f"<div style='display: flex; align-items: center;'>"
-                f"<div style='background-color: {team_color}; width: 10px; height: 10px; margin-right: 5px;'></div>"
-                f"<span style='font-weight: bold;'>{position}: {name}</span>"
-                f"<span style='margin-left: auto; margin-right: -10px;'>{points[0][-1]}</span>"
-                f"</div>",
-                unsafe_allow_html=True
-            )
+        st.markdown(leaderboard, unsafe_allow_html=True)
+
+
+# Function to display Constructors Standings
+def constructors_standings():
+    st.title("F1 Constructors Standings")
+    standings_page("Constructors", "550px")
+
+
+# Function to display Drivers Standings
+def driver_standings():
+    st.title("F1 Drivers Standings")
+    standings_page("Drivers", "565px")
 
 # Render the selected page
 if selection == "Drivers" and year_option:
@@ -0,0 +1,50 @@
+# Which team an entrant string from the results pages is, and which constructor lineage it belongs to.
+# Canonical names are the keys of team_colors.all_team_colors ("Red Bull Racing Honda RBPT" -> "Red Bull").
+from functools import lru_cache
+
+# Engine suppliers and sponsors dropped from multi-word entrant names (covers 2000-2025)
+NAMES_TO_REMOVE = frozenset([
+    "Ferrari", "Mercedes", "Renault", "Honda", "RBPT",
+    "Cosworth", "Toyota", "BMW", "Petronas", "Ford",
+    "Asiatech", "Peugeot", "Scuderia", "Racing", "TAG",
+    "Heuer", "BWT", "Aramco", "Kick", "European", "Acer",
+    "Playlife", "Fondmetal", "Mugen", "Supertec",
+])
+ALIASES = {"RBR": "Red Bull", "STR": "Toro Rosso"}
+
+# Constructor lineages in order, named after the team's latest name (teams not listed are their own lineage)
+LINEAGES = {
+    "Racing Bulls": ("Minardi", "Toro Rosso", "AlphaTauri", "RB", "Racing Bulls"),
+    "Aston Martin": ("Jordan", "MF1", "Spyker", "Force India", "Racing Point", "Aston Martin"),
+    "Mercedes": ("BAR", "Honda", "Brawn", "Mercedes"),
+    "Sauber": ("Sauber", "Alfa Romeo"),
+    "Alpine": ("Benetton", "Renault", "Lotus", "Alpine"),
+    "Red Bull": ("Jaguar", "Red Bull"),
+    "Manor": ("Virgin", "Marussia", "MRT"),
+    "Caterham": ("Lotus", "Caterham"),
+}
+LINEAGE_OF = {team: lineage for lineage, teams in LINEAGES.items() for team in teams}
+LOTUS_RENAULT_FROM = 2012  # "Lotus" was Team Lotus (later Caterham) before that, then the renamed Renault team
+
+
+# Canonical team name of an entrant string, worked out once per distinct string
+@lru_cache(maxsize=None)
+def canonical_name(entrant):
+    names = entrant.split(" ")
+    if len(names) == 1:
+        return entrant
+    # "Racing" is only part of the name when it comes first (Racing Point, Racing Bulls)
+    kept = [name for i, name in enumerate(names) if (name == "Racing" and i == 0) or name not in NAMES_TO_REMOVE]
+    team_name = " ".join(kept)
+    return ALIASES.get(team_name, team_name)
+
+
+def lineage(team, year):
+    if team == "Lotus":
+        return "Alpine" if year >= LOTUS_RENAULT_FROM else "Caterham"
+    return LINEAGE_OF.get(team, team)
+
+
+# The lineage's names from first to latest (just the team for teams that never changed name)
+def lineage_chain(lineage_name):
+    return LINEAGES.get(lineage_name, (lineage_name,))